@@ -0,0 +1,59 @@
+"""--------------------------------------
+Helpers for on-disk caches in storage
+--------------------------------------"""
+
+import os
+
+from config.gui import STORAGE_PATH
+from fingerprint import fingerprints
+
+
+# Path to cache directory
+CACHE_PATH = STORAGE_PATH / "cache"
+
+
+def cache_dir(name):
+    """ Get the cache subdirectory, created if not exists.
+    """
+    path = CACHE_PATH / name
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def source_key(path, stat=None):
+    """ Key of the source file content for the cache entries, the same
+        for renamed and copied files, changes when the file is modified.
+        With the stat, the key of that earlier file version is returned
+        if it's known and not shared with other files.
+        Return: str|None
+    """
+    if stat is None:
+        return fingerprints.identify(path)
+    return fingerprints.stale(path, stat)
+
+
+def evict_lru(name, limit, suffix, companions=()):
+    """ Removes the least recently used (by mtime) cache entries with the
+        suffix while the total size is over the limit. Files with the same
+        stem and companion suffixes are removed together with the entry.
+    """
+    directory = cache_dir(name)
+    entries = []
+    with os.scandir(directory) as files:
+        for entry in files:
+            # Entries that are still being written are skipped
+            if not entry.name.endswith(suffix) or ".part" in entry.name:
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, file_name in sorted(entries):
+        if total <= limit:
+            break
+        stem = file_name[:-len(suffix)]
+        for file_suffix in (suffix, *companions):
+            try:
+                os.remove(directory / f"{stem}{file_suffix}")
+            except FileNotFoundError:
+                pass
+        total -= size
@@ -0,0 +1,70 @@
+"""------------------------------------------------
+Capture of full-resolution video frames as still
+images, encoding runs in a thread pool
+------------------------------------------------"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from config.gui import STORAGE_PATH
+
+
+# Path to captured frames directory
+CAPTURES_PATH = STORAGE_PATH / "captures"
+
+# Supported capture formats: file extension and encoder options
+CAPTURE_FORMATS = {
+    "PNG": (".png", {'compress_level': 3}),
+    "JPEG": (".jpg", {'quality': 95}),
+}
+
+# Encoding pool shared by all previews
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="capture")
+
+
+def capture_path(source_path, position, extension):
+    """ Get the unused file path for the frame captured at position (sec).
+    """
+    stem, _ = os.path.splitext(os.path.basename(source_path))
+    name = f"{stem}_{position:09.3f}s"
+    path = CAPTURES_PATH / f"{name}{extension}"
+    counter = 1
+    while os.path.exists(path):
+        path = CAPTURES_PATH / f"{name}_{counter}{extension}"
+        counter += 1
+    return path
+
+
+def encode_frame(frame, path, fmt):
+    """ Thread function: encodes the frame and writes it to the file.
+        The frame is an RGB array or a callable returning it.
+        Return: path
+    """
+    _, options = CAPTURE_FORMATS[fmt]
+    try:
+        if callable(frame):
+            frame = frame()
+        Image.fromarray(frame).save(path, format=fmt, **options)
+    except Exception:
+        # The reserved file would be left empty
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        raise
+    return path
+
+
+def save_frame(frame, source_path, position, fmt="PNG"):
+    """ Schedules the frame (RGB array or callable) encoding.
+        Return: Future with the file path
+    """
+    fmt = fmt if fmt in CAPTURE_FORMATS else "PNG"
+    extension, _ = CAPTURE_FORMATS[fmt]
+    # The path is reserved right away, so quick captures get distinct names
+    path = capture_path(source_path, position, extension)
+    os.makedirs(path.parent, exist_ok=True)
+    open(path, 'a').close()
+    return _executor.submit(encode_frame, frame, path, fmt)
@@ -0,0 +1,231 @@
+"""-------------------------------------------------
+Catalogue of media sources ingested from folders:
+1. scan_folder      -  walks a directory tree
+2. extract_metadata -  reads image/video metadata
+3. Catalogue        -  indexed storage of sources
+4. ingest_folder    -  bulk folder ingestion
+-------------------------------------------------"""
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+import imageio.v3 as iio
+
+from config.gui import STORAGE_PATH, ALLOWED_IMAGE, ALLOWED_VIDEO
+from decoders import decoders, BACKGROUND
+
+
+# Path to the catalogue json file
+CATALOGUE_PATH = STORAGE_PATH / "catalogue.json"
+
+# Video metadata is read with the decoder, in the shared pool
+_decoder = decoders.client("metadata", BACKGROUND)
+
+# Source kind by allowed file extension
+SOURCE_KINDS = {
+    **{ext: "image" for ext in ALLOWED_IMAGE},
+    **{ext: "video" for ext in ALLOWED_VIDEO},
+}
+
+
+def scan_folder(root, kinds=SOURCE_KINDS):
+    """ Walks the directory tree and yields (path, kind, stat) of allowed files.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        _, file_extension = os.path.splitext(entry.name)
+                        if kind := kinds.get(file_extension.lower()):
+                            yield entry.path, kind, entry.stat()
+                    except OSError:
+                        # Broken link or entry removed while scanning
+                        continue
+        except OSError:
+            # Unreadable directory
+            continue
+
+
+def extract_metadata(path, kind, stat=None):
+    """ Reads the metadata of a single source file.
+        Return: dict
+    """
+    stat = stat or os.stat(path)
+    record = {
+        'path': path,
+        'kind': kind,
+        'bytes': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+    }
+    try:
+        if kind == "image":
+            # Only the file header is read here
+            with Image.open(path) as image:
+                record['size'] = image.size
+                record['mode'] = image.mode
+        else:
+            with decoders.slot(_decoder):
+                metadata = iio.immeta(path, exclude_applied=False)
+            record['size'] = metadata.get('size', (0, 0))
+            record['fps'] = metadata.get('fps', 0)
+            record['duration'] = metadata.get('duration', 0)
+    except Exception as error:
+        record['error'] = str(error)
+    return record
+
+
+class Catalogue:
+    """ Indexed catalogue of image and video sources stored as json file.
+    """
+    def __init__(self, path=CATALOGUE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._records = {}
+        self._index = {kind: set() for kind in set(SOURCE_KINDS.values())}
+        self.load()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, path):
+        return path in self._records
+
+    def load(self):
+        """ Loads the catalogue from the json file.
+        """
+        with self._lock:
+            self._records.clear()
+            for paths in self._index.values():
+                paths.clear()
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r') as file:
+                content = file.read()
+            if len(content) <= 2:
+                return
+            for record in json.loads(content).get('sources', []):
+                self._insert(record)
+
+    def save(self):
+        """ Writes the catalogue to the json file.
+        """
+        with self._lock:
+            data = {'sources': list(self._records.values())}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(data, file, indent=4)
+            os.replace(tmp_path, self.path)
+
+    def _insert(self, record):
+        """ Adds the record and updates the kind index.
+        """
+        self._records[record['path']] = record
+        self._index.setdefault(record['kind'], set()).add(record['path'])
+
+    def add(self, records):
+        """ Adds or replaces records (one or many).
+        """
+        if isinstance(records, dict):
+            records = [records]
+        with self._lock:
+            for record in records:
+                self._insert(record)
+
+    def remove(self, path):
+        """ Removes the record of the given source path.
+        """
+        with self._lock:
+            if record := self._records.pop(path, None):
+                self._index[record['kind']].discard(path)
+            return record
+
+    def get(self, path, default=None):
+        """ Get a record by source path.
+        """
+        return self._records.get(path, default)
+
+    def is_current(self, path, stat):
+        """ Checks if the stored record matches the file stat.
+        """
+        record = self._records.get(path)
+        return bool(record) \
+            and record['bytes'] == stat.st_size \
+            and record['mtime'] == stat.st_mtime_ns
+
+    def refresh(self, path):
+        """ Extracts the metadata of the catalogued source again,
+            the record is removed if the file is gone.
+        """
+        if not (record := self.get(path)):
+            return
+        if os.path.exists(path):
+            self.add(extract_metadata(path, record['kind']))
+        else:
+            self.remove(path)
+        self.save()
+
+    def sources(self, kind=None):
+        """ Get records of all sources or only of the given kind.
+        """
+        with self._lock:
+            if kind is None:
+                return list(self._records.values())
+            return [self._records[path] for path in sorted(self._index.get(kind, ()))]
+
+
+def ingest_folder(root, catalogue, workers=None, progress=None, token=None):
+    """ Scans the folder and extracts metadata of new or changed sources
+        in a worker pool. Calls progress(done, found) as files are processed.
+        Stops early when the cancellation token is set.
+        Return: (found, added)
+    """
+    workers = workers or min(8, (os.cpu_count() or 1) + 2)
+    found = added = done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for path, kind, stat in scan_folder(root):
+            if token and token.cancelled:
+                break
+            found += 1
+            # Unchanged sources are not extracted again
+            if catalogue.is_current(path, stat):
+                done += 1
+                continue
+            futures.append(pool.submit(extract_metadata, path, kind, stat))
+        batch = []
+        for future in as_completed(futures):
+            if token and token.cancelled:
+                # Drop the extractions that are not started yet
+                for pending in futures:
+                    pending.cancel()
+                break
+            batch.append(future.result())
+            done += 1
+            # Store the results in batches
+            if len(batch) >= 200:
+                catalogue.add(batch)
+                added += len(batch)
+                batch = []
+            if progress:
+                progress(done, found)
+        catalogue.add(batch)
+        added += len(batch)
+    catalogue.save()
+    if progress:
+        progress(done, found)
+    return found, added
+
+
+# Shared catalogue instance
+catalogue = Catalogue()
@@ -0,0 +1,135 @@
+"""--------------------------------------------------
+Headless command-line runner of the coroutine
+Application, no Tk window is created.
+
+Usage:
+    python cli.py --pair IMAGE VIDEO [--pair IMAGE VIDEO ...]
+    python cli.py --manifest pairs.json
+
+Manifest is a json list of pairs, either as
+["image", "video"] or {"image": ..., "video": ...}.
+Status is streamed to stdout as json lines.
+--------------------------------------------------"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from config.gui import ALLOWED_IMAGE, ALLOWED_VIDEO
+from coroutine import Application
+
+
+def emit(event, **fields):
+    """ Writes one json line with the event to stdout.
+    """
+    line = {'time': round(time.time(), 3), 'event': event, **fields}
+    sys.stdout.write(json.dumps(line) + "\n")
+    sys.stdout.flush()
+
+
+def load_manifest(path):
+    """ Reads the image/video pairs from the manifest file.
+        Raises OSError, ValueError, KeyError or TypeError if the file
+        can't be read or is malformed.
+        Return: list of tuples
+    """
+    with open(path, 'r') as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise TypeError("the manifest must be a list of pairs")
+    pairs = []
+    for item in data:
+        if isinstance(item, dict):
+            image, video = item['image'], item['video']
+        elif isinstance(item, list):
+            image, video = item
+        else:
+            raise TypeError(f"not an image/video pair: {item!r}")
+        if not (isinstance(image, str) and isinstance(video, str)):
+            raise TypeError(f"paths must be strings: {item!r}")
+        pairs.append((image, video))
+    return pairs
+
+
+def check_pair(image, video):
+    """ Checks that both files exist and have allowed extensions.
+        Return: error message or None
+    """
+    for path, allowed in ((image, ALLOWED_IMAGE), (video, ALLOWED_VIDEO)):
+        _, file_extension = os.path.splitext(path)
+        if file_extension not in allowed:
+            return f"Only {allowed} file extensions allowed: <{path}>"
+        if not os.path.exists(path):
+            return f"Can't find <{path}>"
+    return None
+
+
+def run_pair(index, image, video):
+    """ Runs the application on one image/video pair.
+        Return: True on success
+    """
+    fields = {'pair': index, 'image': image, 'video': video}
+    if error := check_pair(image, video):
+        emit("error", message=error, **fields)
+        return False
+    app = Application(data=(image, video))
+    try:
+        emit("launched", message=app.run().strip(), **fields)
+        for status in app.get_status():
+            emit("status", message=status.strip(), **fields)
+    except KeyboardInterrupt:
+        emit("stopped", message=app.stop().strip(), **fields)
+        raise
+    except Exception as error:
+        emit("error", message=str(error), **fields)
+        return False
+    emit("done", **fields)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the application on image/video pairs without GUI."
+    )
+    parser.add_argument(
+        "--pair",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("IMAGE", "VIDEO"),
+        help="image and video file to process (repeatable)"
+    )
+    parser.add_argument(
+        "--manifest",
+        help="json file with a list of image/video pairs"
+    )
+    args = parser.parse_args(argv)
+
+    pairs = [tuple(pair) for pair in args.pair]
+    if args.manifest:
+        try:
+            pairs += load_manifest(args.manifest)
+        except KeyError as error:
+            emit("error", message=f"Missing key {error} in <{args.manifest}>", manifest=args.manifest)
+            return 2
+        except (OSError, ValueError, TypeError) as error:
+            emit("error", message=f"Can't load <{args.manifest}>: {error}", manifest=args.manifest)
+            return 2
+    if not pairs:
+        parser.error("at least one --pair or --manifest is required")
+
+    failed = 0
+    try:
+        for index, (image, video) in enumerate(pairs):
+            if not run_pair(index, image, video):
+                failed += 1
+    except KeyboardInterrupt:
+        return 130
+    emit("finished", total=len(pairs), failed=failed)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""------------------------------------------------------
+Vectorized comparison of the control image with video
+frames: overlay, difference heatmap and similarity score.
+All functions work on preview sized RGB uint8 arrays.
+------------------------------------------------------"""
+
+from math import ceil
+
+import numpy as np
+from PIL import Image
+
+
+def heat_lut():
+    """ Builds the colormap of the difference: black, blue, red, yellow.
+        Return: array (256, 3) uint8
+    """
+    stops = [0, 64, 160, 255]
+    colors = np.array([(0, 0, 0), (0, 0, 255), (255, 0, 0), (255, 255, 0)])
+    values = np.arange(256)
+    lut = [np.interp(values, stops, colors[:, channel]) for channel in range(3)]
+    return np.stack(lut, axis=1).astype(np.uint8)
+
+
+# Difference colormap
+HEAT_LUT = heat_lut()
+
+
+class ControlImage:
+    """ Control image prepared for the frame sizes.
+        Only a copy reduced to cover the bounds (w, h) is kept, the frame
+        sizes are resized from it without upscaling.
+    """
+    def __init__(self, path, bounds=None):
+        with Image.open(path) as image:
+            if bounds:
+                # Let the decoder skip the resolution that is not needed
+                image.draft("RGB", bounds)
+                ratio = max(bounds[0] / image.width, bounds[1] / image.height)
+                if ratio < 1:
+                    size = (ceil(image.width * ratio), ceil(image.height * ratio))
+                    image = image.resize(size, Image.Resampling.BILINEAR)
+            self.image = image.convert("RGB")
+        self._sizes = {}
+
+    def array(self, size):
+        """ Get the control image of the size (w, h) as int16 array.
+        """
+        if size not in self._sizes:
+            image = self.image.resize(size, Image.Resampling.BILINEAR)
+            self._sizes[size] = np.asarray(image, dtype=np.int16)
+        return self._sizes[size]
+
+
+def difference(frame, control):
+    """ Per pixel absolute difference averaged over channels.
+        Return: array (h, w) uint8
+    """
+    diff = np.abs(frame.astype(np.int16) - control)
+    return (diff.sum(axis=2) // 3).astype(np.uint8)
+
+
+def similarity(diff):
+    """ Similarity score of the frame from 0 to 1.
+    """
+    return 1 - float(diff.mean()) / 255
+
+
+def blend(base, top, opacity):
+    """ Blends the top image over the base one.
+        Return: array uint8
+    """
+    out = base.astype(np.float32)
+    out += (top.astype(np.float32) - out) * opacity
+    return out.astype(np.uint8)
+
+
+def overlay(frame, control, opacity):
+    """ Control image over the frame.
+    """
+    return blend(frame, control, opacity)
+
+
+def heatmap(frame, diff, opacity):
+    """ Colored difference map over the frame.
+    """
+    return blend(frame, HEAT_LUT[diff], opacity)
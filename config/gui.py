@@ -26,6 +26,8 @@ IMAGE_FILES = {
     "add-image"     : "add-image-light-24.png",
     "add-video"     : "add-video-light-24.png",
     "settings"      : "settings-light-24.png",
+    "add-folder"    : "opened-folder-dark-24.png",
+    "take-screenshot" : "take-screenshot-light-24.png",
 }
 
 # Allowed image file extensions
@@ -33,6 +35,19 @@ ALLOWED_IMAGE = [".bmp", ".png", ".jpg", ".jpeg"]
 # Allowed video file extensions
 ALLOWED_VIDEO = [".mov", ".mp4", ".wmv", ".avi"]
 
+# Max size of the video preview proxies cache, bytes
+PROXY_CACHE_SIZE = 2 * 1024 ** 3
+
+# Max size of the decoded frames of a single cached clip, bytes
+FRAME_CACHE_CLIP_SIZE = 512 * 1024 ** 2
+# Max size of the decoded frames cache, bytes
+FRAME_CACHE_SIZE = 4 * 1024 ** 3
+
+# Max size of the image tiles cache, bytes
+TILE_CACHE_SIZE = 2 * 1024 ** 3
+# Max pixels of the scaled tiles kept in memory by the image preview
+TILE_PHOTO_PIXELS = 8 * 1024 ** 2
+
 # Help content
 HEPL_TEXT = """
 Single line of help text
@@ -8,6 +8,9 @@ Application Controllers:
 6. AddImageController
 7. ImagePreviewController
 8. SettingsController
+9. AddFolderController
+10. CompareController
+11. SearchController
 ----------------------"""
 
 import os
@@ -20,6 +23,11 @@ from config.gui import STORAGE_PATH, HEPL_TEXT, ALLOWED_IMAGE, ALLOWED_VIDEO
 from sounds import AppSound
 import jsondata as store
 from modals import *
+from workers import registry
+from proxy import build_proxy
+from fingerprint import fingerprints
+from catalogue import catalogue
+from profiling import profiled
 
 
 class HelpController:
@@ -40,6 +48,7 @@ class StartingController:
     """ Starts the main process.
         Return: tuple|False
     """
+    @profiled("StartingController.main")
     def main(master=None):
         store.FILE_PATH = STORAGE_PATH / "image.json"
         image = store.get_data('source_path')
@@ -102,14 +111,41 @@ class AddVideoController:
                     message=f"Only {ALLOWED_VIDEO} file extensions allowed!"
                 )
                 return False
-            # Save file path in data storage
-            store.set_data({'source_path':source_path})
+            # The previously selected file can be moved or deleted
+            try:
+                fingerprint = fingerprints.identify(source_path)
+            except OSError:
+                Messagebox.show_error(
+                    title="File is Not Found",
+                    message=f"Can't find <{source_path}>\n!"
+                )
+                return False
+            # Save file path with the content fingerprint in data storage
+            store.set_data({
+                'source_path': source_path,
+                'fingerprint': fingerprint,
+            })
+            # Full content hash in background, if enabled in the settings
+            store.FILE_PATH = STORAGE_PATH / "settings.json"
+            if store.get_data('full_hash') == "on":
+                registry.start(fingerprints.compute_full, source_path, name="full-hash")
+            # Build the preview proxy in background
+            if master:
+                screen = (master.winfo_screenwidth(), master.winfo_screenheight())
+                try:
+                    toresize, sizes = video_preview_size(source_path, screen)
+                except Exception:
+                    # Unreadable video or unsupported codec, no proxy then
+                    toresize = False
+                if toresize:
+                    registry.start(build_proxy, source_path, sizes, name="video-proxy")
         return source_path
 
 
 class VideoPreviewController:
     """ Preview of the selected video
     """
+    @profiled("VideoPreviewController.main")
     def main(master=None):
         """ Opens video in the modal window.
         """
@@ -123,8 +159,18 @@ class VideoPreviewController:
             )
             return False
 
+        store.FILE_PATH = STORAGE_PATH / "settings.json"
+        capture_format = store.get_data('capture_format', 'PNG')
+        cache_frames = store.get_data('frame_cache') == "on"
+
         # Configure and open the modal window
-        vim = VideoModal(master, "Video Preview", source_path)
+        vim = VideoModal(
+            master,
+            "Video Preview",
+            source_path,
+            capture_format=capture_format,
+            cache_frames=cache_frames
+        )
         vim.show()
 
 
@@ -159,8 +205,24 @@ class AddImageController:
                     message=f"Only {ALLOWED_IMAGE} file extensions allowed!"
                 )
                 return False
-            # Save file path in data storage
-            store.set_data({'source_path':source_path})
+            # The previously selected file can be moved or deleted
+            try:
+                fingerprint = fingerprints.identify(source_path)
+            except OSError:
+                Messagebox.show_error(
+                    title="File is Not Found",
+                    message=f"Can't find <{source_path}>\n!"
+                )
+                return False
+            # Save file path with the content fingerprint in data storage
+            store.set_data({
+                'source_path': source_path,
+                'fingerprint': fingerprint,
+            })
+            # Full content hash in background, if enabled in the settings
+            store.FILE_PATH = STORAGE_PATH / "settings.json"
+            if store.get_data('full_hash') == "on":
+                registry.start(fingerprints.compute_full, source_path, name="full-hash")
         return source_path
 
 
@@ -187,6 +249,7 @@ class ImagePreviewController:
 class SettingsController:
     """ App settings controls
     """
+    @profiled("SettingsController.main")
     def main(master=None):
         """ Opens the modal window (dialog).
         """
@@ -200,3 +263,75 @@ class SettingsController:
         if data := settings.result:
             store.set_data(data)
 
+
+class AddFolderController:
+    """ Gets the path to a folder with source files.
+    """
+    def main(master=None):
+        """ Opens the modal window (dialog).
+        """
+        store.FILE_PATH = STORAGE_PATH / "folder.json"
+        initialdir = store.get_data('source_path') or None
+        source_path = filedialog.askdirectory(initialdir=initialdir)
+        if source_path:
+            # Save folder path in data storage
+            store.set_data({'source_path':source_path})
+        return source_path
+
+
+class CompareController:
+    """ Comparison of the control image with the selected video
+    """
+    def main(master=None):
+        """ Opens the comparison in the modal window.
+        """
+        if not (start := StartingController.main()):
+            return False
+        image, video = start
+        for source_path in start:
+            # Check if file exists
+            if not os.path.exists(source_path):
+                Messagebox.show_error(
+                    title="File is Not Found",
+                    message=f"Can't find <{source_path}>\n!"
+                )
+                return False
+
+        store.FILE_PATH = STORAGE_PATH / "settings.json"
+        capture_format = store.get_data('capture_format', 'PNG')
+        cache_frames = store.get_data('frame_cache') == "on"
+
+        # Configure and open the modal window
+        cmp = CompareModal(
+            master,
+            "Compare with Control Image",
+            video,
+            image,
+            capture_format=capture_format,
+            cache_frames=cache_frames
+        )
+        cmp.show()
+
+
+class SearchController:
+    """ Search of the control image across the source catalogue
+    """
+    def main(master=None):
+        """ Checks the control image and the catalogue before the search.
+        """
+        store.FILE_PATH = STORAGE_PATH / "image.json"
+        source_path = store.get_data('source_path')
+        # Check if file exists
+        if not source_path or not os.path.exists(source_path):
+            Messagebox.show_error(
+                title="File is Not Found",
+                message=f"Can't find <{source_path}>\n!"
+            )
+            return False
+        if not len(catalogue):
+            Messagebox.show_info(
+                title="Catalogue is Empty",
+                message="Add a folder with image and video sources first."
+            )
+            return False
+        return source_path
@@ -4,6 +4,8 @@ Dummy coroutine module.
 
 import time
 
+from profiling import profiled
+
 statuses = [
     "\n\nThe first task is done.",
     "\nThe second task is done.",
@@ -15,6 +17,7 @@ class Application:
         self.data = data
         self.launched = False
 
+    @profiled("Application.run")
     def run(self):
         """ Launching the program.
         """
@@ -24,6 +27,7 @@ class Application:
         return f"\n\nLaunched with the following data:\n\nImageFile › {self.data[0]}\nVideoFile › {self.data[1]}"
 
 
+    @profiled("Application.get_status")
     def get_status(self):
         """ Get a status of the current task.
         """
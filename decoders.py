@@ -0,0 +1,105 @@
+"""-----------------------------------------------------
+Shared decoder pool. Every decode step of the video
+previews and of the background jobs takes a slot from
+the global budget (CPU count - 1). Free slots go to
+the waiting client with the highest priority, clients
+of the same priority are served in turn: the least
+recently served one first.
+-----------------------------------------------------"""
+
+import os
+import itertools
+import threading
+from contextlib import contextmanager
+
+
+# Client priorities, the lower value is served first
+PREVIEW = 0
+INTERACTIVE = 1
+BACKGROUND = 2
+
+
+class DecoderClient:
+    """ A consumer of the decoder slots.
+    """
+    def __init__(self, name, priority=BACKGROUND):
+        self.name = name
+        self.priority = priority
+        # Order number of the last granted slot
+        self.served = -1
+
+
+class DecoderPool:
+    """ Global budget of the concurrent decode steps.
+    """
+    def __init__(self, slots=None):
+        self.slots = slots or max(1, (os.cpu_count() or 2) - 1)
+        self._cond = threading.Condition()
+        self._busy = 0
+        self._waiting = []
+        self._order = itertools.count()
+
+    def client(self, name, priority=BACKGROUND):
+        return DecoderClient(name, priority)
+
+    def _next(self):
+        # The priority is read on each grant, it can change while waiting
+        return min(self._waiting, key=lambda client: (client.priority, client.served))
+
+    def acquire(self, client, token=None):
+        """ Waits for a free slot of the client.
+            Return: False if cancelled while waiting
+        """
+        with self._cond:
+            self._waiting.append(client)
+            try:
+                while True:
+                    if token and token.cancelled:
+                        return False
+                    if self._busy < self.slots and self._next() is client:
+                        break
+                    self._cond.wait(0.1)
+            finally:
+                self._waiting.remove(client)
+                # The next client can be waiting for this one to leave
+                self._cond.notify_all()
+            self._busy += 1
+            client.served = next(self._order)
+            return True
+
+    def release(self):
+        with self._cond:
+            self._busy -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, client, token=None):
+        """ Context of a single decode step.
+            Return: False if cancelled while waiting
+        """
+        if not self.acquire(client, token):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self.release()
+
+    def iterate(self, client, iterable, token=None):
+        """ Yields the items of the decoder iterable, each one is
+            produced within a slot, processing them is out of it.
+        """
+        iterator = iter(iterable)
+        end = object()
+        while self.acquire(client, token):
+            try:
+                item = next(iterator, end)
+            finally:
+                self.release()
+            if item is end:
+                return
+            yield item
+
+
+# Shared decoder pool instance
+decoders = DecoderPool()
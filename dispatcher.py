@@ -0,0 +1,85 @@
+"""----------------------------------------------------
+Dispatcher of UI updates from worker threads to Tk.
+Workers post events to a lock-free queue (deque append
+and popleft are atomic), the Tk thread drains it with
+an after() pump within a time budget per tick. Keyed
+updates are coalesced, only the latest value is used.
+----------------------------------------------------"""
+
+import sys
+import time
+from collections import deque
+from tkinter import TclError
+
+
+class UIDispatcher:
+    """ Runs the posted callbacks on the Tk thread.
+    """
+    def __init__(self, interval=15, budget=0.008):
+        # Pump interval, ms and the time budget per tick, sec
+        self.interval = interval
+        self.budget = budget
+        self._events = deque()
+        self._latest = {}
+        self._root = None
+        self._after = None
+
+    def attach(self, root):
+        """ Starts pumping the events on the root's Tk thread.
+        """
+        self._root = root
+        self._after = root.after(self.interval, self._pump)
+
+    def detach(self):
+        """ Stops pumping, the pending events are dropped.
+        """
+        if self._root and self._after:
+            self._root.after_cancel(self._after)
+        self._root = self._after = None
+        self._events.clear()
+        self._latest.clear()
+
+    def post(self, callback, *args):
+        """ Queues the callback, every posted call is made.
+        """
+        self._events.append((None, callback, args))
+
+    def post_latest(self, key, callback, *args):
+        """ Queues the callback for the key, if the previous one for the
+            same key is not made yet, only the latest is made.
+        """
+        self._latest[key] = (callback, args)
+        self._events.append((key, None, None))
+
+    def set(self, widget, option, value):
+        """ Queues the widget option update, coalesced per widget option.
+        """
+        self.post_latest((widget, option), _configure, widget, option, value)
+
+    def _pump(self):
+        """ Makes the queued calls until the time budget is over.
+        """
+        deadline = time.perf_counter() + self.budget
+        while self._events and time.perf_counter() < deadline:
+            key, callback, args = self._events.popleft()
+            if key is not None:
+                # Already made with a later value
+                if (entry := self._latest.pop(key, None)) is None:
+                    continue
+                callback, args = entry
+            try:
+                callback(*args)
+            except TclError:
+                # The widget is destroyed after the event is posted
+                pass
+            except Exception:
+                self._root.report_callback_exception(*sys.exc_info())
+        self._after = self._root.after(self.interval, self._pump)
+
+
+def _configure(widget, option, value):
+    widget.configure(**{option: value})
+
+
+# Shared dispatcher instance
+dispatcher = UIDispatcher()
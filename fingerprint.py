@@ -0,0 +1,195 @@
+"""-----------------------------------------------------
+File identity service. A fast sampled fingerprint is
+the file size with a hash of the head, the tail and
+strided chunks read via mmap, an optional full hash is
+computed in background. Results are cached by path,
+size and mtime in the json file.
+-----------------------------------------------------"""
+
+import os
+import json
+import mmap
+import time
+import hashlib
+import threading
+
+from config.gui import STORAGE_PATH
+
+
+# Path to the fingerprints json file
+FINGERPRINTS_PATH = STORAGE_PATH / "fingerprints.json"
+
+# Size of a sampled chunk, bytes
+CHUNK_SIZE = 64 * 1024
+# Number of strided chunks between the head and the tail
+STRIDES = 16
+
+# Changed fingerprints are saved in batches of SAVE_BATCH
+# or when SAVE_INTERVAL seconds passed since the last save
+SAVE_BATCH = 500
+SAVE_INTERVAL = 5.0
+
+
+def sampled_hash(path, size):
+    """ Get the sampled fingerprint of the file.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as file:
+        if size <= CHUNK_SIZE * (STRIDES + 2):
+            # Small files are hashed whole
+            digest.update(file.read())
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                step = (size - CHUNK_SIZE) // (STRIDES + 1)
+                for offset in range(0, size - CHUNK_SIZE + 1, step):
+                    digest.update(data[offset:offset + CHUNK_SIZE])
+                digest.update(data[size - CHUNK_SIZE:])
+    return f"{size:x}-{digest.hexdigest()}"
+
+
+def full_hash(path, token=None):
+    """ Get the hash of the whole file content.
+        Return: str|None if cancelled
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        while chunk := file.read(1024 * 1024):
+            if token and token.cancelled:
+                return None
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FingerprintStore:
+    """ Fingerprints of the source files cached by path, size and mtime.
+    """
+    def __init__(self, path=FINGERPRINTS_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        # Only one thread writes the file, the entries lock isn't held then
+        self._save_lock = threading.Lock()
+        self._entries = {}
+        self._changes = 0
+        self._saved = time.monotonic()
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                content = file.read()
+            if len(content) > 2:
+                self._entries = json.loads(content)
+
+    def save(self, wait=False):
+        """ Writes the changed fingerprints to the json file. Skipped if
+            another thread is writing it, unless wait is set.
+        """
+        if not self._save_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                if not self._changes:
+                    return
+                changes = self._changes
+                content = json.dumps(self._entries, indent=4)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as file:
+                file.write(content)
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._changes -= changes
+                self._saved = time.monotonic()
+        finally:
+            self._save_lock.release()
+
+    def _changed(self):
+        """ Accounts the change, called with the lock held.
+            Return: True if the changes are due to be saved
+        """
+        self._changes += 1
+        return self._changes >= SAVE_BATCH \
+            or time.monotonic() - self._saved >= SAVE_INTERVAL
+
+    def _entry(self, path, stat):
+        """ Get the cached entry if it's of the file version with the stat.
+        """
+        entry = self._entries.get(os.path.abspath(path))
+        if entry and entry['bytes'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def identify(self, path):
+        """ Get the sampled fingerprint of the file.
+        """
+        stat = os.stat(path)
+        with self._lock:
+            if entry := self._entry(path, stat):
+                return entry['sampled']
+        sampled = sampled_hash(path, stat.st_size)
+        with self._lock:
+            self._entries[os.path.abspath(path)] = {
+                'bytes': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'sampled': sampled,
+                'full': None,
+            }
+            due = self._changed()
+        if due:
+            self.save()
+        return sampled
+
+    def full(self, path):
+        """ Get the full hash if it's already computed.
+        """
+        with self._lock:
+            if entry := self._entry(path, os.stat(path)):
+                return entry['full']
+        return None
+
+    def compute_full(self, token, path):
+        """ Worker function: computes the full hash of the file.
+        """
+        sampled = self.identify(path)
+        if self.full(path):
+            return
+        if not (digest := full_hash(path, token)):
+            return
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(path))
+            # The file could change while it was hashed
+            if not (entry and entry['sampled'] == sampled):
+                return
+            entry['full'] = digest
+            due = self._changed()
+        if due:
+            self.save()
+
+    def paths(self, fingerprint):
+        """ Get the known paths of the files with the fingerprint.
+        """
+        with self._lock:
+            return [path for path, entry in self._entries.items()
+                    if entry['sampled'] == fingerprint]
+
+    def stale(self, path, stat):
+        """ Get the fingerprint of the earlier file version with the stat,
+            unless another known file has the same content.
+            Return: str|None
+        """
+        with self._lock:
+            if not (entry := self._entry(path, stat)):
+                return None
+            others = set(self.paths(entry['sampled'])) - {os.path.abspath(path)}
+            return None if others else entry['sampled']
+
+    def forget(self, path):
+        """ Drops the cached fingerprint of the file.
+        """
+        with self._lock:
+            if not self._entries.pop(os.path.abspath(path), None):
+                return
+            due = self._changed()
+        if due:
+            self.save()
+
+
+# Shared fingerprint store instance
+fingerprints = FingerprintStore()
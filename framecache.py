@@ -0,0 +1,108 @@
+"""---------------------------------------------------
+Cache of decoded preview frames of short videos.
+Frames are written as raw RGB into a single file on
+the first playback and read back via memory mapping,
+so repeated and looped playback needs no decoding.
+---------------------------------------------------"""
+
+import os
+import json
+import glob
+
+import numpy as np
+
+from config.gui import FRAME_CACHE_CLIP_SIZE, FRAME_CACHE_SIZE
+from cache import cache_dir, source_key, evict_lru
+
+
+class FrameCache:
+    """ Decoded frames of the video at the given preview size.
+    """
+    def __init__(self, path, size):
+        self.path = path
+        self.size = tuple(size)
+        self.frame_bytes = self.size[0] * self.size[1] * 3
+        name = f"{source_key(path)}_{self.size[0]}x{self.size[1]}"
+        directory = cache_dir("frames")
+        self.raw_path = directory / f"{name}.raw"
+        self.meta_path = directory / f"{name}.json"
+
+    @property
+    def complete(self):
+        return os.path.exists(self.meta_path) and os.path.exists(self.raw_path)
+
+    def fits(self, fps, duration):
+        """ Checks if the clip is short enough to be cached.
+        """
+        count = (fps or 24) * (duration or 0)
+        return 0 < count * self.frame_bytes <= FRAME_CACHE_CLIP_SIZE
+
+    def open(self):
+        """ Maps the cached frames into memory.
+            Return: read-only array (count, height, width, 3)
+        """
+        with open(self.meta_path, 'r') as file:
+            meta = json.load(file)
+        # Mark as recently used
+        os.utime(self.raw_path)
+        count = meta['count']
+        w, h = meta['size']
+        return np.memmap(self.raw_path, dtype=np.uint8, mode='r', shape=(count, h, w, 3))
+
+    def writer(self):
+        return FrameWriter(self)
+
+
+class FrameWriter:
+    """ Appends the frames to the cache file on the first playback.
+        The cache is complete only if all frames are written.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self.count = 0
+        # Size of the first frame, all frames must have it
+        self.size = None
+        self._part_path = cache.raw_path.with_suffix(".part.raw")
+        self._file = open(self._part_path, 'wb')
+
+    @property
+    def active(self):
+        return self._file is not None
+
+    def write(self, image):
+        """ Adds the PIL image, a frame of another size aborts caching.
+        """
+        if self._file is None:
+            return
+        self.size = self.size or image.size
+        frame_bytes = self.size[0] * self.size[1] * 3
+        if image.size != self.size or (self.count + 1) * frame_bytes > FRAME_CACHE_CLIP_SIZE:
+            self.close(complete=False)
+            return
+        self._file.write(np.asarray(image.convert("RGB"), dtype=np.uint8).tobytes())
+        self.count += 1
+
+    def close(self, complete=True):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if not complete or not self.count:
+            os.remove(self._part_path)
+            return
+        os.replace(self._part_path, self.cache.raw_path)
+        with open(self.cache.meta_path, 'w') as file:
+            json.dump({'count': self.count, 'size': self.size}, file)
+        evict_lru("frames", FRAME_CACHE_SIZE, ".raw", companions=(".json",))
+
+
+def remove_frames(path, stat):
+    """ Removes the cached frames of the video version with the given stat.
+        Return: True if there were cached frames
+    """
+    if stat is None or not (key := source_key(path, stat)):
+        return False
+    files = glob.glob(os.fspath(cache_dir("frames") / f"{key}_*"))
+    for file_path in files:
+        os.remove(file_path)
+    return bool(files)
@@ -2,15 +2,26 @@
 Main file of GUI Application
 ---------------------------"""
 
+import json
+
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.style import Bootstyle
-from ttkbootstrap.scrolled import ScrolledFrame
 
 from controllers import *
 from config.gui import *
 
 from coroutine import Application
+from catalogue import catalogue, ingest_folder
+from views import VirtualList, catalogue_row, match_row
+from workers import registry
+from dispatcher import dispatcher
+from watcher import watcher
+from fingerprint import fingerprints
+from tiles import TilePyramid, remove_pyramid
+from proxy import build_proxy, remove_proxy
+from framecache import remove_frames
+from search import search, index_catalogue, remove_signatures
 
 
 class AppWindow(ttk.Frame):
@@ -49,7 +60,7 @@ class AppWindow(ttk.Frame):
             bootstyle="primary inverse",
             font="-size 14 -weight normal"
         )
-        title.pack(side=LEFT, padx=(8, 160))
+        title.pack(side=LEFT, padx=(8, 40))
         _func = lambda e, p=self: HelpController.main(e, p)
         title.bind('<Button-1>', _func)
 
@@ -101,6 +112,18 @@ class AppWindow(ttk.Frame):
         )
         btn.pack(side=LEFT, ipadx=5, ipady=8)
 
+        # Button "Add folder"
+        _func = lambda: self.add_folder()
+        btn = ttk.Button(
+            master=buttonbar,
+            text="Add folder",
+            style="cufon.TButton",
+            image="add-folder",
+            compound=LEFT,
+            command=_func
+        )
+        btn.pack(side=LEFT, ipadx=5, ipady=8)
+
         # Button "Settings"
         _func = lambda: SettingsController.main()
         btn = ttk.Button(
@@ -117,19 +140,14 @@ class AppWindow(ttk.Frame):
         output_container = ttk.Frame(self)
         output_container.pack(fill=BOTH, expand=YES, padx=(6, 0), pady=7)
 
-        # Scroll implementation
-        scrolled_frame = ScrolledFrame(
-            output_container,
-            autohide=True,
-            bootstyle="default",
-            scrollheight=9999
-        )
-        scrolled_frame.pack(fill=BOTH, expand=YES, padx=(1, 2))
+        # Blocks container (fixed height blocks at the top)
+        blocks = ttk.Frame(output_container)
+        blocks.pack(fill=X, side=TOP, padx=(1, 2))
 
         # Image frame block ---------------------
 
         self.image_widget = ttk.Labelframe(
-            master=scrolled_frame,
+            master=blocks,
             text=" CONTROL IMAGE ",
             style="LIGHT"
         )
@@ -156,10 +174,17 @@ class AppWindow(ttk.Frame):
             command=_func
         )
 
+        self.search_btn = ttk.Button(
+            master=self.image_widget,
+            text="Search catalogue",
+            bootstyle="OUTLINE",
+            command=self.search_catalogue
+        )
+
         # Video frame block ---------------------
 
         self.video_widget = ttk.Labelframe(
-            master=scrolled_frame,
+            master=blocks,
             text=" VIDEO TRACK ",
             style="LIGHT"
         )
@@ -186,10 +211,18 @@ class AppWindow(ttk.Frame):
             command=_func
         )
 
+        _func = lambda: CompareController.main()
+        self.compare_btn = ttk.Button(
+            master=self.video_widget,
+            text="Compare",
+            bootstyle="OUTLINE",
+            command=_func
+        )
+
         # Execution status block ----------------
 
         self.execstatus = ttk.Labelframe(
-            master=scrolled_frame,
+            master=blocks,
             text=" EXECUTION STATUS ",
             style="LIGHT"
         )
@@ -202,15 +235,111 @@ class AppWindow(ttk.Frame):
         )
         self.status_label.pack(side=LEFT, padx=10, pady=(8, 12))
 
+        # Results block -------------------------
 
-    def coroutine(self, start):
+        self.results_widget = ttk.Labelframe(
+            master=output_container,
+            text=" RESULTS ",
+            style="LIGHT"
+        )
+
+        # Only the visible rows of the list have widgets
+        self.results = VirtualList(self.results_widget)
+        self.results.pack(fill=BOTH, expand=YES, padx=(8, 2), pady=(4, 8))
+
+        # Watching the sources for changes
+        self.watching()
+
+
+    def watching(self):
+        """ Registers the cached artifacts depending on the sources
+            and starts the watcher.
+        """
+        stale_tiles = set()
+
+        def invalidate_tiles(path, old_stat):
+            if remove_pyramid(path, old_stat):
+                stale_tiles.add(path)
+
+        def rebuild_tiles(path):
+            # Only the pyramids that were built before are rebuilt
+            if path in stale_tiles and os.path.exists(path):
+                stale_tiles.discard(path)
+                registry.start(TilePyramid(path).build, name="tile-pyramid")
+
+        stale_proxies = set()
+        # Read on the Tk thread, the rebuilds run on the watcher thread
+        screen = (self.winfo_screenwidth(), self.winfo_screenheight())
+
+        def invalidate_proxy(path, old_stat):
+            if remove_proxy(path, old_stat):
+                stale_proxies.add(path)
+
+        def rebuild_proxy(path):
+            if path in stale_proxies and os.path.exists(path):
+                stale_proxies.discard(path)
+                toresize, sizes = video_preview_size(path, screen)
+                if toresize:
+                    registry.start(build_proxy, path, sizes, name="video-proxy")
+
+        def stored_sources():
+            # The sources selected in the previous session, read directly:
+            # jsondata file path is switched by the controllers on the Tk thread
+            paths = []
+            for name in ("image.json", "video.json"):
+                try:
+                    with open(STORAGE_PATH / name, 'r') as file:
+                        paths.append(json.load(file)['source_path'])
+                except (OSError, ValueError, KeyError, TypeError):
+                    continue
+            return paths
+
+        watcher.add_provider(lambda: [record['path'] for record in catalogue.sources()])
+        watcher.add_provider(stored_sources)
+        watcher.depend("metadata", lambda path, _: None, catalogue.refresh)
+        watcher.depend("thumbnails", lambda path, _: dispatcher.post(self.results.invalidate_thumb, path))
+        watcher.depend("tiles", invalidate_tiles, rebuild_tiles)
+        watcher.depend("proxies", invalidate_proxy, rebuild_proxy)
+        # Decoded frames are cached again on the next playback
+        watcher.depend("frames", remove_frames)
+        # Signatures are built again on the next search or ingestion
+        watcher.depend("signatures", remove_signatures)
+        # Cache keys of the old versions are content fingerprints,
+        # so they are dropped after the artifacts are invalidated
+        watcher.depend("fingerprints", lambda path, _: fingerprints.forget(path))
+        registry.start(watcher.run, name="watcher")
+
+
+    def report(self, message, clear=False):
+        """ Shows the message in the status block and logs it to the results.
+            Safe to call from worker threads.
+        """
+        dispatcher.post(self.show_report, message, clear)
+
+
+    def show_report(self, message, clear=False):
+        """ Updates the status and results blocks on the Tk thread.
+        """
+        if clear:
+            self.results.clear()
+        lines = [line for line in message.splitlines() if line.strip()]
+        self.status_label['text'] = lines[-1] if lines else "..."
+        self.results.extend({'text': line} for line in lines)
+        self.results.see_end()
+        self.execstatus.pack(fill=X, padx=(7, 11), pady=10)
+        self.results_widget.pack(fill=BOTH, expand=YES, padx=(8, 13), pady=10)
+
+
+    def coroutine(self, token, start):
         """ Launching the coroutine.
         """
         self.app = Application(data=start)
-        self.status_label['text'] += self.app.run()
+        self.report(self.app.run())
         # Load the current process status
         for status in self.app.get_status():
-            self.status_label['text'] += status
+            if token.cancelled:
+                break
+            self.report(status)
 
 
     def starting_process(self):
@@ -222,19 +351,17 @@ class AppWindow(ttk.Frame):
         if start := StartingController.main():
             self.started = True
             self.stopped = False
-            self.status_label['text'] = "Launching..."
+            self.report("Launching...", clear=True)
+            watcher.watch(start[0])
+            watcher.watch(start[1])
             # Load image widget
             self.image_path.set(start[0])
             self.image_widget.pack(fill=X, padx=(7, 11), pady=10)
             # Load video widget
             self.video_path.set(start[1])
             self.video_widget.pack(fill=X, padx=(7, 11), pady=10)
-            # Load execution status widget
-            self.execstatus.pack(fill=X, padx=(7, 11), pady=10)
-            # Running a coroutine on a new thread
-            thr = threading.Thread(target=self.coroutine, args=(start,))
-            thr.setDaemon(True)
-            thr.start()
+            # Running a coroutine on a worker thread
+            registry.start(self.coroutine, start, name="coroutine")
         else:
             self.started = False
             self.stopped = True
@@ -247,7 +374,8 @@ class AppWindow(ttk.Frame):
             return
 
         if stop := StoppingController.main():
-            self.status_label['text'] += self.app.stop()
+            registry.cancel("coroutine")
+            self.report(self.app.stop())
             self.started = False
             self.stopped = True
         else:
@@ -258,25 +386,113 @@ class AppWindow(ttk.Frame):
     def add_video(self):
         """ Call to controller to recieve video track path.
         """
-        if vidpath := AddVideoController.main():
+        if vidpath := AddVideoController.main(master=self):
+            watcher.watch(vidpath)
             self.video_path.set(vidpath)
             self.video_btn.pack(side=RIGHT, padx=10, pady=(4, 12))
+            self.compare_btn.pack(side=RIGHT, padx=(10, 0), pady=(4, 12))
             self.video_widget.pack(fill=X, padx=(7, 11), pady=10)
         else:
             self.video_path.set("Nothing selected")
             self.video_btn.pack_forget()
+            self.compare_btn.pack_forget()
 
 
     def add_image(self):
         """ Call to controller to recieve image source path.
         """
         if imgpath := AddImageController.main():
+            watcher.watch(imgpath)
             self.image_path.set(imgpath)
             self.image_btn.pack(side=RIGHT, padx=10, pady=(4, 12))
+            self.search_btn.pack(side=RIGHT, padx=(10, 0), pady=(4, 12))
             self.image_widget.pack(fill=X, padx=(7, 11), pady=10)
         else:
             self.image_path.set("Nothing selected")
             self.image_btn.pack_forget()
+            self.search_btn.pack_forget()
+
+
+    def closing(self):
+        """ Stops the process and all workers, then closes the main window.
+        """
+        if self.started and self.app:
+            self.app.stop()
+        registry.shutdown()
+        # The fingerprints not saved yet
+        fingerprints.save(wait=True)
+        dispatcher.detach()
+        self.master.destroy()
+
+
+    def ingestion(self, token, folder):
+        """ Ingesting the folder sources into the catalogue.
+        """
+        def progress(done, found):
+            # Only the latest progress is shown if updates come faster
+            dispatcher.set(
+                self.status_label,
+                'text',
+                f"Ingesting <{folder}>: processed {done} of {found} files..."
+            )
+
+        found, added = ingest_folder(folder, catalogue, progress=progress, token=token)
+        if token.cancelled:
+            return
+        self.report(f"Ingested <{folder}>: found {found} files, {added} new or changed." \
+                    f" Catalogue size: {len(catalogue)} sources.", clear=True)
+        rows = [catalogue_row(record) for record in catalogue.sources()]
+        dispatcher.post(self.results.extend, rows)
+        # Signatures for the similarity search are built in background
+        registry.start(index_catalogue, catalogue.sources(), name="signature-index")
+
+
+    def add_folder(self):
+        """ Call to controller to recieve sources folder path.
+        """
+        if folder := AddFolderController.main():
+            self.report(f"Scanning <{folder}>...")
+            # Running the ingestion on a worker thread
+            registry.start(self.ingestion, folder, name="ingestion")
+
+
+
+    def searching(self, token, control):
+        """ Searching the control image across the catalogue.
+        """
+        name = os.path.basename(control)
+
+        def progress(done, total):
+            dispatcher.set(
+                self.status_label,
+                'text',
+                f"Searching <{name}>: processed {done} of {total} sources..."
+            )
+
+        def found(ranking):
+            # The best matches so far, a ranking not shown yet is replaced
+            rows = [match_row(match) for match in ranking]
+            dispatcher.post_latest((self.results, "items"), self.results.set_items, rows)
+
+        ranking, stats = search(control, catalogue.sources(), token=token, progress=progress, found=found)
+        if token.cancelled:
+            return
+        dispatcher.set(
+            self.status_label,
+            'text',
+            f"Search of <{name}> finished: {len(ranking)} best matches," \
+            f" {stats['scored']} scored, {stats['pruned']} pruned, {stats['indexed']} indexed."
+        )
+
+
+    def search_catalogue(self):
+        """ Call to controller to search the control image across the catalogue.
+        """
+        if control := SearchController.main():
+            # Only one search at a time, the new one replaces the running
+            registry.cancel("search")
+            self.report(f"Searching <{control}> across {len(catalogue)} sources...", clear=True)
+            registry.start(self.searching, control, name="search")
 
 
 if __name__ == "__main__":
@@ -288,7 +504,9 @@ if __name__ == "__main__":
         size=(950, 600),
         resizable=(False, True)
     )
-    AppWindow(app)
+    dispatcher.attach(app)
+    window = AppWindow(app)
+    app.protocol("WM_DELETE_WINDOW", window.closing)
     app.mainloop()
 
 
@@ -1,8 +1,9 @@
 """--------------------------------------------------
 1. HelpModal      -  for displaying the help text
 2. VideoModal     -  for a preview of the selected video
-3. ImageModal     -  for a preview of the selected image
-4. SettingsModal  -  for managing the application settings
+3. CompareModal   -  for comparing the control image with the video
+4. ImageModal     -  for a zoomable preview of the selected image
+5. SettingsModal  -  for managing the application settings
 -------------------------------------------------- """
 
 import ttkbootstrap as ttk
@@ -13,10 +14,61 @@ from ttkbootstrap.scrolled import ScrolledText
 
 from PIL import ImageTk, Image, ImageOps
 import imageio.v3 as iio
-from math import sqrt
-import threading
+import numpy as np
+from math import sqrt, ceil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import time
-import sys
+
+from config.gui import TILE_PHOTO_PIXELS
+from workers import registry
+from dispatcher import dispatcher
+from tiles import TilePyramid
+from capture import save_frame, CAPTURE_FORMATS
+from proxy import lookup
+from framecache import FrameCache
+from quality import QualityController
+from decoders import decoders, PREVIEW, BACKGROUND
+from compare import ControlImage, difference, similarity, overlay, heatmap
+
+
+def window_size(screen_w, screen_h):
+    """ Get the dimensions of the modal window on the screen (w, h).
+    """
+    # The area covered by the window on the screen
+    window_area = .35
+    vector = sqrt(window_area)
+    return int(screen_w * vector), int(screen_h * vector)
+
+
+def fit_to_window(frame_w, frame_h, screen_w, screen_h):
+    """ Determines if the frame exceeds the modal window and its new size.
+        Return: (bool, (width, height))
+    """
+    # Calc the modal window dimensions
+    window_w, window_h = window_size(screen_w, screen_h)
+
+    # If at least one of the dimensions exceeds the window size
+    if frame_w > window_w or frame_h > window_h:
+        # Calc the ratio of image resizing
+        if (frame_w / window_w) >= (frame_h / window_h):
+            ratio = round((window_w / frame_w), 6)
+        else:
+            ratio = round((window_h / frame_h), 6)
+        # Calculating new image size
+        width = round(frame_w * ratio)
+        height = round(frame_h * ratio)
+        return True, (width, height)
+    else:
+        return False, (None, None)
+
+
+def video_preview_size(path, screen):
+    """ Determines the preview size of the video on the screen (w, h).
+        Return: (bool, (width, height))
+    """
+    metadata = iio.immeta(path, exclude_applied=False)
+    return fit_to_window(*metadata.get('size', (0, 0)), *screen)
 
 
 class HelpModal(Dialog):
@@ -49,11 +101,28 @@ class HelpModal(Dialog):
 class VideoModal(Dialog):
     """ Modal window for a video preview.
     """
-    def __init__(self, parent, title, path):
+    def __init__(self, parent, title, path, capture_format="PNG", cache_frames=False):
         super().__init__(parent, title)
         self.title = title
         self.path = path
         self.meta = {}
+        self.worker = None
+        # Preview proxy of the video for the preview size, if built
+        self.proxy = None
+        # Decoded frames cache, if enabled and the clip is short
+        self.cache_frames = cache_frames
+        self.frame_cache = None
+        self.quality = None
+        # The last frame, its position and if it's at original resolution
+        self.frame = None
+        self.original = True
+        self.index = 0
+        self.position = 0
+        # Number of the last preview frame shown on the Tk thread
+        self.shown = 0
+        self.capture_format = capture_format
+        # Decode steps of the preview in the shared decoder pool
+        self.decoder = decoders.client(f"video-preview {title}", PREVIEW)
 
     def get_resizes(self, master):
         """ Determines if there is a need for resizing and new frame sizes.
@@ -72,33 +141,15 @@ class VideoModal(Dialog):
             'duration': metadata.get('duration', 0)
         }
 
-        # The area covered by the window on the screen
-        window_area = .35
-        vector = sqrt(window_area)
-
-        # Calc the modal window dimensions
-        window_w = int(screen_w * vector)
-        window_h = int(screen_h * vector)
-
-        # If at least one of the dimensions exceeds the window size
-        if frame_w > window_w or frame_h > window_h:
-            # Calc the ratio of image resizing
-            if (frame_w / window_w) >= (frame_h / window_h):
-                ratio = round((window_w / frame_w), 6)
-            else:
-                ratio = round((window_h / frame_h), 6)
-            # Calculating new image size
-            width = round(frame_w * ratio)
-            height = round(frame_h * ratio)
-            return True, (width, height)
-        else:
-            return False, (None, None)
+        return fit_to_window(frame_w, frame_h, screen_w, screen_h)
 
     def create_body(self, master):
         """ Overridden from Dialog.
         """
         # Get data for resizing
         toresize, sizes = self.get_resizes(master)
+        if toresize:
+            self.proxy = lookup(self.path, sizes)
 
         # Label text (at top of the window)
         sep = " | "
@@ -106,68 +157,308 @@ class VideoModal(Dialog):
                f" {sep} Fps: {self.meta['fps']}" \
                f" {sep} Duration: {self.meta['duration']}"
 
-        # Label for displaying video as frame images
-        image_label = ttk.Label(
+        ttk.Label(
             master,
             text = text,
-            compound=BOTTOM,
             font=("Sans-serif", 10, "bold")
-        )
-        image_label.pack()
+        ).pack()
+
+        # Fixed size area, frames at lower quality are smaller
+        display_w, display_h = sizes if toresize else self.meta['size']
+        screen = ttk.Frame(master, width=display_w, height=display_h)
+        screen.pack_propagate(False)
+        screen.pack()
+
+        # Label for displaying video as frame images
+        image_label = ttk.Label(screen)
+        image_label.pack(expand=YES)
+
+        # Cache of the decoded preview frames for short clips
+        if self.cache_frames:
+            cache = FrameCache(self.path, sizes if toresize else self.meta['size'])
+            if cache.complete or cache.fits(self.meta['fps'], self.meta['duration']):
+                self.frame_cache = cache
+
+        # Time in frame, sec
+        if self.meta['fps'] >= 24:
+            fsec = 1 / 24
+        else:
+            fsec = 1 / self.meta['fps']
+        # Preview quality adapted to the frame time
+        self.quality = QualityController(budget=fsec)
 
         # Thread function
-        def stream(label):
-            # Time in frame, sec
-            if self.meta['fps'] >= 24:
-                fsec = 1 / 24
-            else:
-                fsec = 1 / self.meta['fps']
-            # Loop start time
-            now = time.time()
-            for frame in iio.imiter(self.path, plugin="pyav"):
+        def stream(token, label):
+            # Frame processing start time, the first frame includes opening
+            # the file and waiting for the decoder, so it isn't measured
+            now = None
+            posted = 0
+            for image in self.frames(token, toresize, sizes):
+                image = self.compose(image)
                 then = time.time()
-                if (then - now) < fsec:
-                    time.sleep(fsec - (then - now))
-                now = then
-                # Frame to image convert
-                image = Image.fromarray(frame)
-                # Кesize the image if necessary
-                if toresize:
-                    w = sizes[0]
-                    h = sizes[1]
-                    image = ImageOps.contain(image, (w, h), Image.NEAREST)
-                try:
-                    imgtk = ImageTk.PhotoImage(image)
-                    label.config(image=imgtk)
-                    label.image = imgtk
-                except:
-                    sys.exit(1)
-
-        # Starting the thread
-        thread = threading.Thread(target=stream, args=(image_label,))
-        thread.setDaemon(True)
-        thread.start()
+                if now is not None:
+                    elapsed = then - now
+                    if elapsed < fsec:
+                        if token.wait(fsec - elapsed):
+                            break
+                    # The previous frame is still not shown, it's dropped:
+                    # the Tk thread is behind, so the frame is late
+                    if self.shown < posted:
+                        elapsed = max(elapsed, fsec)
+                    self.quality.update(elapsed)
+                # Shown on the Tk thread, a frame not shown yet is replaced
+                posted += 1
+                dispatcher.post_latest((label, "image"), self.show_frame, label, image, posted)
+                now = time.time()
+
+        # Starting the worker, it's cancelled when the modal window closes
+        self.worker = registry.start(stream, image_label, name="video-preview")
+        image_label.bind('<Destroy>', lambda e: self.worker.cancel(), add="+")
+
+        # Minimized previews yield the decoder slots to the visible ones
+        toplevel = master.winfo_toplevel()
+
+        def visibility(event, priority):
+            if event.widget is toplevel:
+                self.decoder.priority = priority
+
+        toplevel.bind('<Unmap>', lambda e: visibility(e, BACKGROUND), add="+")
+        toplevel.bind('<Map>', lambda e: visibility(e, PREVIEW), add="+")
+
+    def compose(self, image):
+        """ Hook for processing the preview frame on the worker thread.
+        """
+        return image
 
+    def show_frame(self, label, image, number=0):
+        """ Displays the frame image, called on the Tk thread.
+        """
+        imgtk = ImageTk.PhotoImage(image)
+        label.config(image=imgtk)
+        label.image = imgtk
+        self.shown = number
+
+    def frames(self, token, toresize, sizes):
+        """ Yields the preview frames as PIL images.
+            Cached frames are read from the memory-mapped file and looped,
+            otherwise the video is decoded and the cache is written if enabled.
+        """
+        cache = self.frame_cache
+        if not (cache and cache.complete):
+            writer = cache.writer() if cache else None
+            # Play the low-resolution proxy if it's already built
+            source = self.proxy or self.path
+            self.original = not self.proxy
+            finished = False
+            try:
+                # The decoder and the file are released on leaving the context
+                with iio.imopen(source, "r", plugin="pyav") as file:
+                    for index, frame in enumerate(decoders.iterate(self.decoder, file.iter(), token)):
+                        if token.cancelled:
+                            break
+                        # Retained for capture, the decoder gives a new array per frame
+                        self.frame = frame
+                        self.index = index
+                        self.position = index / (self.meta['fps'] or 24)
+                        # Frame to image convert
+                        image = Image.fromarray(frame)
+                        # The cached frames must be of the same size,
+                        # only the filter is adapted while the cache is written
+                        scale = 1 if writer and writer.active else self.quality.scale
+                        # Кesize the image if necessary
+                        if toresize or scale < 1:
+                            w, h = sizes if toresize else image.size
+                            w = max(1, round(w * scale))
+                            h = max(1, round(h * scale))
+                            image = ImageOps.contain(image, (w, h), self.quality.filter)
+                        if writer:
+                            writer.write(image)
+                        yield image
+                # Only the fully played clip is cached
+                finished = not token.cancelled
+            finally:
+                if writer:
+                    writer.close(complete=finished)
+            if not (cache and cache.complete):
+                return
+
+        # Looped playback of the cached frames, no decoding
+        frames = cache.open()
+        self.original = False
+        try:
+            while not token.cancelled:
+                for index in range(len(frames)):
+                    if token.cancelled:
+                        break
+                    self.frame = frames[index]
+                    self.index = index
+                    self.position = index / (self.meta['fps'] or 24)
+                    image = Image.fromarray(self.frame)
+                    # Cached frames are preview sized, only downscaled if late
+                    if (scale := self.quality.scale) < 1:
+                        w = max(1, round(image.width * scale))
+                        h = max(1, round(image.height * scale))
+                        image = image.resize((w, h), self.quality.filter)
+                    yield image
+        finally:
+            # Unmap the file
+            del frames
 
     def create_buttonbox(self, master):
         """ Overridden from Dialog.
         """
-        pass
+        frame = ttk.Frame(master, padding=(5, 10))
+
+        # Capture button
+        ttk.Button(
+            master=frame,
+            text="Capture frame",
+            image="take-screenshot",
+            compound=LEFT,
+            bootstyle="primary",
+            command=self.on_capture
+        ).pack(padx=5, side=RIGHT)
+
+        self.capture_label = ttk.Label(
+            master=frame,
+            font=("Sans-serif", 10)
+        )
+        self.capture_label.pack(padx=5, side=LEFT)
+
+        ttk.Separator(self._toplevel).pack(fill=X, padx=10)
+        frame.pack(side=BOTTOM, fill=X, anchor=S)
+
+    def on_capture(self, *_):
+        """ Saves the current frame at original resolution.
+            Encoding runs in the thread pool, playback is not stalled.
+            The retained frame is used while the original file is played,
+            the proxy and cached frames are downscaled, so then the frame
+            is read from the original file.
+        """
+        if self.frame is None:
+            return
+        frame = self.frame
+        source = "retained frame"
+        if not self.original:
+            frame = lambda index=self.index: self.read_original(index)
+            source = "original file"
+        future = save_frame(frame, self.path, self.position, self.capture_format)
+        future.add_done_callback(lambda f: dispatcher.post(self.captured, f))
+        self.capture_label['text'] = f"Capturing {self.position:.3f} sec from the {source}..."
+
+    def read_original(self, index):
+        """ Capture pool function: reads the frame of the original file,
+            the decoding takes a slot of the shared decoder pool.
+        """
+        with decoders.slot(self.decoder):
+            return iio.imread(self.path, index=index, plugin="pyav")
+
+    def captured(self, future):
+        """ Reports the finished capture.
+        """
+        if error := future.exception():
+            self.capture_label['text'] = f"Capture failed: {error}"
+        else:
+            self.capture_label['text'] = f"Saved <{future.result()}>"
+
+
+class CompareModal(VideoModal):
+    """ Video preview with the control image overlay or the difference
+        heatmap and the similarity score of each frame.
+    """
+    def __init__(self, parent, title, path, image_path, **kwargs):
+        super().__init__(parent, title, path, **kwargs)
+        self.image_path = image_path
+        # Loaded in create_body, reduced to the window size
+        self.control = None
+        # Plain attributes, read by the worker thread
+        self.mode = "Heatmap"
+        self.opacity = .5
+        # Created after the preview worker is started
+        self.score_label = None
+
+    def create_body(self, master):
+        """ Overridden from VideoModal.
+        """
+        # Preview frames never exceed the window, so neither does the control
+        screen = (master.winfo_screenwidth(), master.winfo_screenheight())
+        self.control = ControlImage(self.image_path, window_size(*screen))
+        super().create_body(master)
+
+        frame = ttk.Frame(master, padding=(5, 5))
+        frame.pack(fill=X)
+
+        mode = ttk.StringVar(value=self.mode)
+        for text in ("Overlay", "Heatmap"):
+            ttk.Radiobutton(
+                master=frame,
+                text=text,
+                value=text,
+                variable=mode,
+                command=lambda: setattr(self, 'mode', mode.get())
+            ).pack(side=LEFT, padx=5)
+
+        ttk.Label(master=frame, text="Opacity").pack(side=LEFT, padx=(15, 5))
+        ttk.Scale(
+            master=frame,
+            from_=0,
+            to=1,
+            value=self.opacity,
+            length=120,
+            command=lambda value: setattr(self, 'opacity', float(value))
+        ).pack(side=LEFT)
+
+        self.score_label = ttk.Label(
+            master=frame,
+            text="Similarity: ...",
+            font=("Sans-serif", 10, "bold")
+        )
+        self.score_label.pack(side=RIGHT, padx=5)
+
+    def compose(self, image):
+        """ Overridden from VideoModal.
+        """
+        frame = np.asarray(image.convert("RGB"))
+        control = self.control.array(image.size)
+        diff = difference(frame, control)
+        score = similarity(diff)
+        if self.mode == "Overlay":
+            frame = overlay(frame, control, self.opacity)
+        else:
+            frame = heatmap(frame, diff, self.opacity)
+        if self.score_label is not None:
+            dispatcher.set(self.score_label, 'text', f"Similarity: {score:.1%}")
+        return Image.fromarray(frame)
 
 
 class ImageModal(Dialog):
-    """ Modal window for image preview.
+    """ Modal window for image preview with zoom and pan.
+        The image is rendered from the tile pyramid, only the tiles
+        covering the visible viewport are loaded.
     """
     def __init__(self, parent, title, path):
         super().__init__(parent, title)
         self.title = title
         self.path = path
+        self.pyramid = None
+        self.worker = None
+        # Display px per original px, viewport origin in original px
+        self.scale = 1
+        self.origin = (0, 0)
+        self._fit_scale = 1
+        self._drag = None
+        # Tile loading and the cache of tiles ready to display
+        self._photos = OrderedDict()
+        self._photo_pixels = 0
+        self._tiles = OrderedDict()
+        self._loading = {}
+        self._executor = ThreadPoolExecutor(max_workers=2)
 
     def create_body(self, master):
         """ Overridden from Dialog.
         """
-        image = Image.open(self.path)
-        image_w, image_h = image.size
+        self.pyramid = TilePyramid(self.path)
+        image_w, image_h = self.pyramid.size
 
         # Get screen dimensions
         screen_w = master.winfo_screenwidth()
@@ -191,26 +482,193 @@ class ImageModal(Dialog):
             # Calculating new image size
             w = round(image_w * ratio)
             h = round(image_h * ratio)
-            image = image.resize((w, h), Image.Resampling.LANCZOS)
+        else:
+            ratio = 1
+            w, h = image_w, image_h
+        self.scale = self._fit_scale = ratio
 
-        imgtk = ImageTk.PhotoImage(image)
-        text = f"Original size: {image_w} x{image_h} px"
+        self.canvas = ttk.Canvas(master, width=w, height=h, highlightthickness=0)
+        self.canvas.pack()
 
-        label = ttk.Label(
+        self.label = ttk.Label(
             master,
-            text=text,
-            image=imgtk,
-            compound=BOTTOM,
             font=("Sans-serif", 10, "bold")
         )
-        label.image = imgtk
-        label.pack()
+        self.label.pack()
+
+        self.canvas.bind('<MouseWheel>', self.on_zoom)
+        self.canvas.bind('<Button-4>', self.on_zoom)
+        self.canvas.bind('<Button-5>', self.on_zoom)
+        self.canvas.bind('<ButtonPress-1>', self.on_drag_start)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<Double-Button-1>', self.on_reset)
+        self.canvas.bind('<Destroy>', self.on_destroy)
+
+        # Tiles not cached yet are cut in background, coarse levels first
+        self.worker = registry.start(self.pyramid.build, name="tile-pyramid")
+        self.render()
 
     def create_buttonbox(self, master):
         """ Overridden from Dialog.
         """
         pass
 
+    def on_zoom(self, event):
+        """ Zooms in/out keeping the point under the cursor in place.
+        """
+        factor = 1.25 if event.num == 4 or event.delta > 0 else 1 / 1.25
+        scale = min(max(self.scale * factor, min(self._fit_scale, 1)), 8)
+        x0, y0 = self.origin
+        px = x0 + event.x / self.scale
+        py = y0 + event.y / self.scale
+        self.origin = (px - event.x / scale, py - event.y / scale)
+        self.scale = scale
+        self.render()
+
+    def on_drag_start(self, event):
+        self._drag = (event.x, event.y)
+
+    def on_drag(self, event):
+        """ Pans the viewport.
+        """
+        x0, y0 = self.origin
+        dx, dy = event.x - self._drag[0], event.y - self._drag[1]
+        self._drag = (event.x, event.y)
+        self.origin = (x0 - dx / self.scale, y0 - dy / self.scale)
+        self.render()
+
+    def on_reset(self, event):
+        """ Back to the whole image in the window.
+        """
+        self.scale = self._fit_scale
+        self.origin = (0, 0)
+        self.render()
+
+    def on_destroy(self, event):
+        self.worker.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def render(self):
+        """ Draws the tiles covering the viewport.
+        """
+        view_w = int(self.canvas['width'])
+        view_h = int(self.canvas['height'])
+        image_w, image_h = self.pyramid.size
+
+        # Keep the image inside the viewport
+        x0 = min(max(0, self.origin[0]), max(0, image_w - view_w / self.scale))
+        y0 = min(max(0, self.origin[1]), max(0, image_h - view_h / self.scale))
+        self.origin = (x0, y0)
+
+        # The level with the smallest resolution that is still not less
+        # than the display resolution
+        level = 0
+        while level + 1 < len(self.pyramid.levels) and 2 ** -(level + 1) >= self.scale:
+            level += 1
+        level_scale = 2 ** -level
+        # Display px per level px
+        factor = self.scale / level_scale
+
+        ts = self.pyramid.tile_size
+        cols, rows = self.pyramid.grid(level)
+        col_first = int(x0 * level_scale // ts)
+        row_first = int(y0 * level_scale // ts)
+        col_last = min(cols - 1, int((x0 + view_w / self.scale) * level_scale // ts))
+        row_last = min(rows - 1, int((y0 + view_h / self.scale) * level_scale // ts))
+
+        # Viewport in level px
+        view_box = (
+            x0 * level_scale,
+            y0 * level_scale,
+            (x0 + view_w / self.scale) * level_scale,
+            (y0 + view_h / self.scale) * level_scale,
+        )
+
+        self.canvas.delete("tile")
+        visible = set()
+        for row in range(row_first, row_last + 1):
+            for col in range(col_first, col_last + 1):
+                key = (level, col, row)
+                visible.add(key)
+                if rendered := self._photo(key, factor, view_box):
+                    photo, (left, top) = rendered
+                    x = round(((col * ts + left) / level_scale - x0) * self.scale)
+                    y = round(((row * ts + top) / level_scale - y0) * self.scale)
+                    self.canvas.create_image(x, y, image=photo, anchor=NW, tags="tile")
+        # Loads of the tiles scrolled away are dropped
+        for key in list(self._loading):
+            if key not in visible and self._loading[key].cancel():
+                del self._loading[key]
+
+        self.label['text'] = f"Original size: {image_w} x{image_h} px" \
+                             f"  |  Zoom: {round(self.scale * 100)}%"
+
+    def _photo(self, key, factor, view_box):
+        """ Get the tile PhotoImage scaled by factor with its offset in the
+            tile (level px) or start loading the tile.
+            Upscaled tiles are cropped to the viewport first, so only the
+            visible part is resized and kept.
+            Return: (PhotoImage, (left, top))|None
+        """
+        if key not in self._tiles:
+            if key not in self._loading:
+                self._loading[key] = self._executor.submit(self._load, key)
+            return None
+        if (tile := self._tiles[key]) is None:
+            # Unreadable tile
+            return None
+
+        box = (0, 0, tile.width, tile.height)
+        if factor > 1:
+            _, col, row = key
+            ts = self.pyramid.tile_size
+            box = (
+                max(0, int(view_box[0] - col * ts)),
+                max(0, int(view_box[1] - row * ts)),
+                min(tile.width, ceil(view_box[2] - col * ts)),
+                min(tile.height, ceil(view_box[3] - row * ts)),
+            )
+            if box[0] >= box[2] or box[1] >= box[3]:
+                return None
+
+        photo_key = (key, factor, box)
+        if photo_key in self._photos:
+            self._photos.move_to_end(photo_key)
+            return self._photos[photo_key], box[:2]
+
+        if box != (0, 0, tile.width, tile.height):
+            tile = tile.crop(box)
+        if factor != 1:
+            size = (max(1, ceil(tile.width * factor)), max(1, ceil(tile.height * factor)))
+            tile = tile.resize(size, Image.Resampling.BILINEAR)
+        photo = self._photos[photo_key] = ImageTk.PhotoImage(tile)
+        # Keep the scaled tiles within the pixel budget
+        self._photo_pixels += tile.width * tile.height
+        while self._photo_pixels > TILE_PHOTO_PIXELS and len(self._photos) > 1:
+            _, dropped = self._photos.popitem(last=False)
+            self._photo_pixels -= dropped.width() * dropped.height()
+        return photo, box[:2]
+
+    def _load(self, key):
+        """ Thread function: reads or cuts the tile.
+        """
+        try:
+            tile = self.pyramid.tile(*key)
+        except Exception:
+            tile = None
+        dispatcher.post(self._loaded, key, tile)
+
+    def _loaded(self, key, tile):
+        """ Picks up the loaded tile on the Tk thread.
+        """
+        self._loading.pop(key, None)
+        self._tiles[key] = tile
+        self._tiles.move_to_end(key)
+        while len(self._tiles) > 256:
+            self._tiles.popitem(last=False)
+        # One render for the tiles loaded at once
+        dispatcher.post_latest((self, "render"), self.render)
+
 
 class SettingsModal(Dialog):
     """ Form for application settings.
@@ -221,11 +679,15 @@ class SettingsModal(Dialog):
         self._s2 = ttk.StringVar(value=data.get('s2', 'off'))
         self._s3 = ttk.StringVar(value=data.get('s3', '10'))
         self._s4 = ttk.StringVar(value=data.get('s4', 'Option A'))
+        self._capture_format = ttk.StringVar(value=data.get('capture_format', 'PNG'))
+        self._frame_cache = ttk.StringVar(value=data.get('frame_cache', 'off'))
+        self._profiling = ttk.StringVar(value=data.get('profiling', 'off'))
+        self._full_hash = ttk.StringVar(value=data.get('full_hash', 'off'))
 
     def create_body(self, master):
         """ Overridden from Dialog.
         """
-        self._toplevel.geometry('350x600')
+        self._toplevel.geometry('350x760')
 
         # Body container
         frame = ttk.Frame(master)
@@ -317,6 +779,81 @@ class SettingsModal(Dialog):
         # Bind the virtual event
         # cbo.bind('<<ComboboxSelected>>', lambda e: print("Selected:", cbo.get()))
 
+        # 5. Settings item
+        ttk.Separator(frame).pack(fill=X)
+        item = ttk.Frame(frame)
+        item.pack(fill=X, padx=15, pady=(6, 8))
+
+        ttk.Label(
+            master=item,
+            text="Captured frames format",
+        ).pack(side=LEFT, pady=(3, 6))
+
+        cbo = ttk.Combobox(
+            master=item,
+            bootstyle="default",
+            state="readonly",
+            width=12,
+            textvariable=self._capture_format
+        )
+        cbo['values'] = tuple(CAPTURE_FORMATS)
+        cbo.current(cbo['values'].index(self._capture_format.get()))
+        cbo.pack(side=RIGHT, padx=(0, 2))
+
+        # 6. Settings item
+        ttk.Separator(frame).pack(fill=X)
+        item = ttk.Frame(frame)
+        item.pack(fill=X, padx=15, pady=(10, 15))
+
+        ttk.Label(
+            master=item,
+            text="Cache decoded frames of short clips",
+        ).pack(side=LEFT)
+
+        ttk.Checkbutton(
+            master=item,
+            bootstyle="default-round-toggle",
+            variable=self._frame_cache,
+            onvalue="on",
+            offvalue="off"
+        ).pack(side=RIGHT)
+
+        # 7. Settings item
+        ttk.Separator(frame).pack(fill=X)
+        item = ttk.Frame(frame)
+        item.pack(fill=X, padx=15, pady=(10, 15))
+
+        ttk.Label(
+            master=item,
+            text="Profiling mode",
+        ).pack(side=LEFT)
+
+        ttk.Checkbutton(
+            master=item,
+            bootstyle="default-round-toggle",
+            variable=self._profiling,
+            onvalue="on",
+            offvalue="off"
+        ).pack(side=RIGHT)
+
+        # 8. Settings item
+        ttk.Separator(frame).pack(fill=X)
+        item = ttk.Frame(frame)
+        item.pack(fill=X, padx=15, pady=(10, 15))
+
+        ttk.Label(
+            master=item,
+            text="Full content hash of sources",
+        ).pack(side=LEFT)
+
+        ttk.Checkbutton(
+            master=item,
+            bootstyle="default-round-toggle",
+            variable=self._full_hash,
+            onvalue="on",
+            offvalue="off"
+        ).pack(side=RIGHT)
+
     def create_buttonbox(self, master):
         """ Overridden from Dialog.
         """
@@ -367,6 +904,10 @@ class SettingsModal(Dialog):
             's2': self._s2.get(),
             's3': self._s3.get(),
             's4': self._s4.get(),
+            'capture_format': self._capture_format.get(),
+            'frame_cache': self._frame_cache.get(),
+            'profiling': self._profiling.get(),
+            'full_hash': self._full_hash.get(),
         }
 
 
@@ -0,0 +1,131 @@
+"""----------------------------------------------------
+Opt-in profiling of the application entry points.
+Enabled by the "Profiling mode" setting or by the
+APP_PROFILE=1 environment variable. Each profiled call
+writes a report with the top hot functions (cProfile)
+and the top allocations (tracemalloc) to the
+diagnostics folder.
+----------------------------------------------------"""
+
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import inspect
+import threading
+import tracemalloc
+from functools import wraps
+
+from config.gui import STORAGE_PATH
+
+
+# Path to diagnostics directory
+DIAGNOSTICS_PATH = STORAGE_PATH / "diagnostics"
+
+# Number of functions and allocations in the report
+TOP_N = 25
+
+# Only one call is profiled at a time, concurrent calls run as usual
+_lock = threading.Lock()
+
+
+def enabled():
+    """ Checks the environment variable and the settings.
+    """
+    if os.environ.get("APP_PROFILE", "").lower() in ("1", "on", "true", "yes"):
+        return True
+    # Read directly, the json storage module path is shared with the GUI thread
+    try:
+        with open(STORAGE_PATH / "settings.json", 'r') as file:
+            return json.load(file).get('profiling') == "on"
+    except (OSError, ValueError):
+        return False
+
+
+class Session:
+    """ Profiling session of a single call.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.elapsed = 0
+        # Allocations are traced only if nobody else traces them
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    def call(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.profile.runcall(func, *args, **kwargs)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def report(self):
+        """ Writes the report file.
+            Return: path
+        """
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._tracing:
+            tracemalloc.stop()
+
+        stream = io.StringIO()
+        stream.write(f"{self.name}\n\nElapsed: {self.elapsed:.3f} sec\n")
+        stream.write(f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n")
+
+        stream.write(f"\nTop {TOP_N} functions by cumulative time:\n")
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_N)
+
+        stream.write(f"\nTop {TOP_N} allocations by line:\n\n")
+        for stat in snapshot.statistics('lineno')[:TOP_N]:
+            stream.write(f"{stat}\n")
+
+        os.makedirs(DIAGNOSTICS_PATH, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = DIAGNOSTICS_PATH / f"{stamp}-{self.name}-{threading.get_ident()}.txt"
+        with open(path, 'w') as file:
+            file.write(stream.getvalue())
+        return path
+
+
+def profiled(name):
+    """ Decorator of the entry point profiled when profiling is enabled.
+        Generator functions are profiled over the whole iteration.
+    """
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not enabled() or not _lock.acquire(blocking=False):
+                    yield from func(*args, **kwargs)
+                    return
+                session = Session(name)
+                try:
+                    generator = session.call(func, *args, **kwargs)
+                    while True:
+                        try:
+                            item = session.call(next, generator)
+                        except StopIteration:
+                            return
+                        yield item
+                finally:
+                    session.report()
+                    _lock.release()
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not enabled() or not _lock.acquire(blocking=False):
+                    return func(*args, **kwargs)
+                session = Session(name)
+                try:
+                    return session.call(func, *args, **kwargs)
+                finally:
+                    session.report()
+                    _lock.release()
+        return wrapper
+    return decorator
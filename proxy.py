@@ -0,0 +1,110 @@
+"""------------------------------------------------
+Low-resolution preview proxies of video files.
+A proxy is the video downscaled to the preview
+window size, it's much cheaper to decode than the
+original. Proxies are kept in the cache directory
+limited by PROXY_CACHE_SIZE, least recently used
+proxies are removed first.
+------------------------------------------------"""
+
+import os
+import glob
+import threading
+
+from PIL import Image
+import numpy as np
+import imageio.v3 as iio
+
+from config.gui import PROXY_CACHE_SIZE
+from cache import cache_dir, source_key, evict_lru
+from decoders import decoders, BACKGROUND
+
+
+def even_size(size):
+    """ The encoder needs even frame dimensions.
+    """
+    return size[0] - size[0] % 2, size[1] - size[1] % 2
+
+
+def proxy_path(path, size):
+    """ Get the path of the video proxy of the preview size.
+    """
+    w, h = even_size(size)
+    return cache_dir("proxies") / f"{source_key(path)}_{w}x{h}.mp4"
+
+
+def proxies(key):
+    """ Get the built proxies of the content key, of all sizes.
+    """
+    files = glob.glob(os.fspath(cache_dir("proxies") / f"{key}_*.mp4"))
+    return [file_path for file_path in files if ".part" not in file_path]
+
+
+def lookup(path, size=None):
+    """ Get the proxy of the video for the preview size if it's built,
+        any built proxy of the video without the size.
+        Return: Path|None
+    """
+    try:
+        if size:
+            proxy = proxy_path(path, size)
+        else:
+            proxy = next(iter(proxies(source_key(path))), None)
+    except OSError:
+        return None
+    if not proxy or not os.path.exists(proxy):
+        return None
+    # Mark as recently used
+    os.utime(proxy)
+    return proxy
+
+
+def build_proxy(token, path, size):
+    """ Worker function: transcodes the video to the proxy of the size.
+    """
+    proxy = proxy_path(path, size)
+    if os.path.exists(proxy):
+        return
+    size = even_size(size)
+    fps = iio.immeta(path, exclude_applied=False).get('fps', 24) or 24
+    # The same proxy can be built by the Add video action and the watcher at once
+    tmp_path = proxy.with_suffix(f".{threading.get_ident()}.part.mp4")
+    try:
+        with iio.imopen(path, "r", plugin="pyav") as source, \
+             iio.imopen(tmp_path, "w", plugin="pyav") as target:
+            target.init_video_stream("libx264", fps=fps)
+            decoder = decoders.client(f"video-proxy {os.path.basename(path)}", BACKGROUND)
+            for frame in decoders.iterate(decoder, source.iter(), token):
+                image = Image.fromarray(frame).resize(size, Image.Resampling.BILINEAR)
+                # Encoding takes a slot as well
+                with decoders.slot(decoder, token) as granted:
+                    if not granted:
+                        break
+                    target.write_frame(np.asarray(image))
+        if token.cancelled:
+            os.remove(tmp_path)
+            return
+        os.replace(tmp_path, proxy)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    evict()
+
+
+def remove_proxy(path, stat):
+    """ Removes the proxy of the video version with the given stat.
+        Return: True if there was a proxy
+    """
+    if stat is None or not (key := source_key(path, stat)):
+        return False
+    files = proxies(key)
+    for file_path in files:
+        os.remove(file_path)
+    return bool(files)
+
+
+def evict(limit=PROXY_CACHE_SIZE):
+    """ Removes the least recently used proxies over the cache size limit.
+    """
+    evict_lru("proxies", limit, ".mp4")
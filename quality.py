@@ -0,0 +1,89 @@
+"""-----------------------------------------------------
+Adaptive quality of the video preview. The measured
+frame time is compared with the frame budget, quality
+steps down when frames are late and up when there is
+headroom. Thresholds, patience and a cooldown after
+each step keep the quality from oscillating.
+-----------------------------------------------------"""
+
+from PIL import Image
+
+
+# Quality ladder from the cheapest to the best:
+# (preview resolution scale, resample filter)
+QUALITY_LEVELS = [
+    (0.5, Image.Resampling.NEAREST),
+    (0.75, Image.Resampling.NEAREST),
+    (1.0, Image.Resampling.NEAREST),
+    (1.0, Image.Resampling.BILINEAR),
+    (1.0, Image.Resampling.LANCZOS),
+]
+
+
+class QualityController:
+    """ Chooses the quality level by the frame time.
+    """
+    def __init__(self, budget, levels=QUALITY_LEVELS, level=2,
+                 late=0.9, headroom=0.6, patience_down=3, patience_up=45, cooldown=24):
+        # Frame budget, sec
+        self.budget = budget
+        self.levels = levels
+        self.level = level
+        # Frame time shares of the budget for stepping down and up
+        self.late = late
+        self.headroom = headroom
+        # Number of frames in a row needed to step down and up
+        self.patience_down = patience_down
+        self.patience_up = patience_up
+        # Number of frames to keep the level after a step
+        self.cooldown = cooldown
+
+        self.frame_time = None
+        self._late_frames = 0
+        self._easy_frames = 0
+        self._hold = 0
+
+    @property
+    def scale(self):
+        return self.levels[self.level][0]
+
+    @property
+    def filter(self):
+        return self.levels[self.level][1]
+
+    def update(self, frame_time):
+        """ Accounts the time of the frame processing, sec.
+            Return: True if the level is changed
+        """
+        # Smoothed frame time
+        if self.frame_time is None:
+            self.frame_time = frame_time
+        else:
+            self.frame_time += 0.2 * (frame_time - self.frame_time)
+
+        if self._hold:
+            self._hold -= 1
+            return False
+
+        if self.frame_time > self.budget * self.late:
+            self._late_frames += 1
+            self._easy_frames = 0
+        elif self.frame_time < self.budget * self.headroom:
+            self._easy_frames += 1
+            self._late_frames = 0
+        else:
+            self._late_frames = self._easy_frames = 0
+
+        if self._late_frames >= self.patience_down and self.level > 0:
+            return self._step(-1)
+        if self._easy_frames >= self.patience_up and self.level < len(self.levels) - 1:
+            return self._step(1)
+        return False
+
+    def _step(self, delta):
+        self.level += delta
+        self._late_frames = self._easy_frames = 0
+        self._hold = self.cooldown
+        # The smoothed time is measured at the previous level
+        self.frame_time = None
+        return True
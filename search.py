@@ -0,0 +1,419 @@
+"""-----------------------------------------------------
+Perceptual similarity search of the control image
+across the catalogue. Sources are indexed as 64-bit
+difference hashes (dHash) of the image or of video
+frames sampled every SAMPLE_STEP seconds. Hashes of
+all sources are kept in one index keyed by content
+fingerprint. A query scores the index in chunks with
+vectorized Hamming distances and keeps the top-k best
+matches; sources are scanned by their popcount lower
+bound and the scan stops when the rest can't beat
+the current k-th match.
+-----------------------------------------------------"""
+
+import os
+import io
+import heapq
+import threading
+
+import numpy as np
+from PIL import Image
+import imageio.v3 as iio
+
+from cache import cache_dir, source_key
+from proxy import lookup
+from decoders import decoders, INTERACTIVE, BACKGROUND
+
+
+# Hash side, the hash has HASH_SIZE ** 2 bits
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE ** 2
+# Video sampling step, sec and the max number of samples per video
+SAMPLE_STEP = 1.0
+MAX_SAMPLES = 600
+# Number of the best matches
+TOP_K = 20
+# Number of sources scored at once
+CHUNK_SOURCES = 512
+
+# Set bits count of every byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def dhash(image):
+    """ Difference hash of the image: signs of the horizontal gradients
+        of the image reduced to HASH_SIZE rows.
+        Return: np.uint64
+    """
+    image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+    gray = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits).view(">u8").astype(np.uint64)[0]
+
+
+def popcount(values):
+    """ Number of set bits of every uint64 value.
+        Return: array uint8
+    """
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+class SignatureIndex:
+    """ Signatures of all indexed sources in one set of arrays: the hashes
+        of the source i are hashes[offsets[i]:offsets[i + 1]]. Added and
+        removed sources are merged into the arrays on the next snapshot.
+    """
+    def __init__(self, path=None):
+        self.path = path or cache_dir("signatures") / "index.npz"
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._changes = 0
+        self._added = {}
+        self._removed = set()
+        self._arrays = self._empty()
+        self.load()
+
+    def _empty(self):
+        return {
+            'keys': np.array([], dtype=str),
+            'offsets': np.zeros(1, dtype=np.int64),
+            'hashes': np.array([], dtype=np.uint64),
+            'times': np.array([], dtype=np.float32),
+        }
+
+    def load(self):
+        try:
+            with np.load(self.path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except Exception:
+            # Missing, truncated or corrupt index, the sources are indexed again
+            arrays = self._empty()
+        with self._lock:
+            self._arrays = self._complete(arrays)
+
+    def _complete(self, arrays):
+        """ Adds the derived arrays: positions by key and popcount bounds.
+        """
+        offsets = arrays['offsets']
+        lengths = np.diff(offsets)
+        pops = popcount(arrays['hashes'])
+        # Per source popcount range, empty sources get an impossible range
+        minpop = np.full(len(lengths), HASH_BITS + 1, dtype=np.int16)
+        maxpop = np.full(len(lengths), -HASH_BITS - 1, dtype=np.int16)
+        if len(pops):
+            filled = lengths > 0
+            starts = offsets[:-1][filled]
+            minpop[filled] = np.minimum.reduceat(pops, starts)
+            maxpop[filled] = np.maximum.reduceat(pops, starts)
+        arrays['lengths'] = lengths
+        arrays['minpop'] = minpop
+        arrays['maxpop'] = maxpop
+        arrays['positions'] = {str(key): i for i, key in enumerate(arrays['keys'])}
+        return arrays
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._removed:
+                return False
+            return key in self._added or key in self._arrays['positions']
+
+    def add(self, key, signatures):
+        with self._lock:
+            self._removed.discard(key)
+            self._added[key] = signatures
+            self._changes += 1
+
+    def remove(self, key):
+        """ Removes the source signatures.
+            Return: True if the source was indexed
+        """
+        with self._lock:
+            if key not in self:
+                return False
+            self._added.pop(key, None)
+            self._removed.add(key)
+            self._changes += 1
+            return True
+
+    def snapshot(self):
+        """ Get the arrays with the added and removed sources merged.
+            The arrays are not changed afterwards, they are read without lock.
+            Return: dict
+        """
+        with self._lock:
+            if not (self._added or self._removed):
+                return self._arrays
+            old = self._arrays
+            dropped = self._removed | set(self._added)
+            keep = [i for i, key in enumerate(old['keys']) if str(key) not in dropped]
+            lengths = old['lengths'][keep]
+            # Row numbers of the kept sources hashes
+            rows = np.repeat(old['offsets'][:-1][keep] - np.cumsum(lengths) + lengths, lengths) \
+                + np.arange(lengths.sum())
+            added = list(self._added.items())
+            keys = [str(old['keys'][i]) for i in keep] + [key for key, _ in added]
+            hashes = [old['hashes'][rows]] + [signatures['hashes'] for _, signatures in added]
+            times = [old['times'][rows]] + [signatures['times'] for _, signatures in added]
+            lengths = np.concatenate([lengths, [len(signatures['hashes']) for _, signatures in added]])
+            self._arrays = self._complete({
+                'keys': np.array(keys, dtype=str),
+                'offsets': np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+                'hashes': np.concatenate(hashes).astype(np.uint64),
+                'times': np.concatenate(times).astype(np.float32),
+            })
+            self._added.clear()
+            self._removed.clear()
+            return self._arrays
+
+    def save(self, wait=False):
+        """ Writes the changed index to the file, skipped if another thread
+            is writing it, unless wait is set.
+        """
+        if not self._save_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                if not self._changes:
+                    return
+                changes = self._changes
+                arrays = self.snapshot()
+            buffer = io.BytesIO()
+            np.savez(buffer, **{name: arrays[name] for name in ('keys', 'offsets', 'hashes', 'times')})
+            tmp_path = self.path.with_suffix(f".{threading.get_ident()}.part")
+            with open(tmp_path, 'wb') as file:
+                file.write(buffer.getvalue())
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._changes -= changes
+        finally:
+            self._save_lock.release()
+
+
+# Shared signature index instance
+index = SignatureIndex()
+
+
+def sample_frames(path, decoder, token=None):
+    """ Yields (time, image) of the video frames sampled every SAMPLE_STEP
+        seconds, long videos are sampled sparser.
+    """
+    metadata = iio.immeta(path, exclude_applied=False)
+    fps = metadata.get('fps') or 24
+    duration = metadata.get('duration') or 0
+    step = max(SAMPLE_STEP, duration / MAX_SAMPLES)
+    # The proxy has the same timeline and is cheaper to decode
+    source = lookup(path) or path
+    with iio.imopen(source, "r", plugin="pyav") as file:
+        for time in np.arange(0, max(duration, step), step):
+            with decoders.slot(decoder, token) as granted:
+                if not granted:
+                    return
+                try:
+                    frame = file.read(index=int(time * fps))
+                except Exception:
+                    # The duration of the container can be inexact
+                    return
+            yield float(time), Image.fromarray(frame)
+
+
+def build_signatures(path, kind, token=None, priority=BACKGROUND):
+    """ Computes the signatures of the source and adds them to the index.
+        Return: dict|None if cancelled
+    """
+    key = source_key(path)
+    decoder = decoders.client(f"signatures {os.path.basename(path)}", priority)
+    if kind == "image":
+        with decoders.slot(decoder, token) as granted:
+            if not granted:
+                return None
+            with Image.open(path) as image:
+                hashes, times = [dhash(image)], [np.nan]
+    else:
+        hashes, times = [], []
+        for time, image in sample_frames(path, decoder, token):
+            hashes.append(dhash(image))
+            times.append(time)
+        if token and token.cancelled:
+            return None
+    signatures = {
+        'hashes': np.array(hashes, dtype=np.uint64),
+        'times': np.array(times, dtype=np.float32),
+    }
+    index.add(key, signatures)
+    return signatures
+
+
+def remove_signatures(path, stat):
+    """ Removes the signatures of the source version with the given stat.
+        Return: True if there were signatures
+    """
+    if stat is None or not (key := source_key(path, stat)):
+        return False
+    if removed := index.remove(key):
+        index.save()
+    return removed
+
+
+def index_catalogue(token, records, progress=None):
+    """ Worker function: builds the missing signatures of the sources.
+        Return: number of the indexed sources
+    """
+    indexed = 0
+    try:
+        for done, record in enumerate(records, 1):
+            if token.cancelled:
+                break
+            try:
+                if source_key(record['path']) not in index:
+                    if build_signatures(record['path'], record['kind'], token) is not None:
+                        indexed += 1
+            except Exception:
+                # Unreadable sources are not indexed
+                pass
+            if progress:
+                progress(done, len(records))
+    finally:
+        index.save(wait=True)
+    return indexed
+
+
+def search(control_path, records, k=TOP_K, token=None, progress=None, found=None):
+    """ Searches the control image across the sources. Indexed sources are
+        scored first, the missing signatures are built on the way.
+        Calls progress(done, total) as sources are processed and
+        found(ranking) when the top-k matches change.
+        Return: (ranking, stats)
+    """
+    with Image.open(control_path) as image:
+        query = dhash(image)
+    query_pop = int(popcount([query])[0])
+
+    # Max heap of the best matches by the distance
+    heap = []
+    stats = {'scored': 0, 'pruned': 0, 'indexed': 0, 'failed': 0}
+    total = len(records)
+    counter = iter(range(total + 1, 0, -1))
+
+    def ranking():
+        matches = sorted((-distance, order, match) for distance, order, match in heap)
+        return [match for _, _, match in matches]
+
+    def limit():
+        return -heap[0][0] if len(heap) >= k else HASH_BITS + 1
+
+    def push(key_records, distance, time):
+        """ Puts the matches of the source into the top-k.
+            Return: True if the top-k is changed
+        """
+        changed = False
+        for record in key_records:
+            if distance >= limit():
+                break
+            match = {
+                'path': record['path'],
+                'kind': record['kind'],
+                'time': None if np.isnan(time) else float(time),
+                'distance': distance,
+                'score': 1 - distance / HASH_BITS,
+            }
+            item = (-distance, next(counter), match)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heapreplace(heap, item)
+            changed = True
+        return changed
+
+    # Records by the content key, copies share the signatures
+    arrays = index.snapshot()
+    indexed = {}
+    pending = []
+    for record in records:
+        try:
+            key = source_key(record['path'])
+        except OSError:
+            stats['failed'] += 1
+            continue
+        if key in arrays['positions']:
+            indexed.setdefault(key, []).append(record)
+        else:
+            pending.append((key, record))
+
+    # Indexed sources in the order of the distance lower bound:
+    # |popcount(a) - popcount(b)| <= hamming(a, b)
+    keys = list(indexed)
+    sources = np.array([arrays['positions'][key] for key in keys], dtype=np.int64)
+    sources = sources[arrays['lengths'][sources] > 0] if len(sources) else sources
+    bounds = np.maximum(0, np.maximum(
+        arrays['minpop'][sources] - query_pop,
+        query_pop - arrays['maxpop'][sources]
+    ))
+    order = np.argsort(bounds, kind="stable")
+    sources, bounds = sources[order], bounds[order]
+    done = total - len(pending) - len(sources)
+
+    for start in range(0, len(sources), CHUNK_SOURCES):
+        if token and token.cancelled:
+            break
+        # The rest of the sources can't get into the top-k
+        if bounds[start] >= limit():
+            stats['pruned'] += len(sources) - start
+            break
+        chunk = sources[start:start + CHUNK_SOURCES]
+        done += len(chunk)
+        chunk = chunk[bounds[start:start + CHUNK_SOURCES] < limit()]
+        lengths = arrays['lengths'][chunk]
+        stats['pruned'] += min(CHUNK_SOURCES, len(sources) - start) - len(chunk)
+        stats['scored'] += len(chunk)
+        # Hashes of the chunk sources in one array
+        firsts = np.cumsum(lengths) - lengths
+        rows = np.repeat(arrays['offsets'][chunk] - firsts, lengths) + np.arange(lengths.sum())
+        distances = popcount(arrays['hashes'][rows] ^ query)
+        best = np.minimum.reduceat(distances, firsts)
+        changed = False
+        for i in np.argsort(best, kind="stable"):
+            if best[i] >= limit():
+                break
+            segment = distances[firsts[i]:firsts[i] + lengths[i]]
+            time = arrays['times'][rows[firsts[i] + int(segment.argmin())]]
+            changed |= push(indexed[str(arrays['keys'][chunk[i]])], int(best[i]), time)
+        if changed and found:
+            found(ranking())
+        if progress:
+            progress(done, total)
+
+    # Indexing the sources that are not indexed yet
+    built = {}
+    try:
+        for key, record in pending:
+            # Nothing can beat k exact matches
+            if (token and token.cancelled) or (len(heap) >= k and heap[0][0] == 0):
+                break
+            try:
+                # Copies of a file are indexed once
+                if key not in built:
+                    built[key] = build_signatures(record['path'], record['kind'], token, INTERACTIVE)
+                    stats['indexed'] += built[key] is not None
+                signatures = built[key]
+            except Exception:
+                stats['failed'] += 1
+            else:
+                # Cancelled while indexing
+                if signatures is None:
+                    break
+                if len(signatures['hashes']):
+                    stats['scored'] += 1
+                    distances = popcount(signatures['hashes'] ^ query)
+                    best = int(distances.argmin())
+                    if push([record], int(distances[best]), signatures['times'][best]) and found:
+                        found(ranking())
+            done += 1
+            if progress:
+                progress(done, total)
+    finally:
+        if stats['indexed']:
+            index.save(wait=True)
+
+    return ranking(), stats
@@ -0,0 +1,181 @@
+"""--------------------------------------------------
+Multi-resolution tile pyramid of a large image.
+Level 0 is the original image, each next level is
+downsampled by 2 until it fits into a single tile.
+Tiles are cached on disk as png files, limited by
+TILE_CACHE_SIZE, least recently used pyramids are
+removed first.
+--------------------------------------------------"""
+
+import os
+import json
+import shutil
+import threading
+from math import ceil
+
+from PIL import Image
+
+from config.gui import TILE_CACHE_SIZE
+from cache import cache_dir, source_key
+
+
+# Tile side, px
+TILE_SIZE = 256
+
+# Large control images are expected
+Image.MAX_IMAGE_PIXELS = None
+
+
+class TilePyramid:
+    """ Tile pyramid of the image file.
+    """
+    def __init__(self, path, tile_size=TILE_SIZE):
+        self.path = path
+        self.tile_size = tile_size
+        with Image.open(path) as image:
+            self.size = image.size
+        self.dir = cache_dir("tiles") / source_key(path)
+        # Opening marks the pyramid as recently used
+        os.makedirs(self.dir, exist_ok=True)
+        os.utime(self.dir)
+
+        # Level sizes, the last level fits into a single tile
+        w, h = self.size
+        self.levels = [(w, h)]
+        while w > tile_size or h > tile_size:
+            w, h = ceil(w / 2), ceil(h / 2)
+            self.levels.append((w, h))
+
+        # Level images kept in memory while the tiles are cut,
+        # each level is computed once even if requested concurrently
+        self._images = {}
+        self._lock = threading.RLock()
+
+    @property
+    def complete(self):
+        return os.path.exists(self.dir / "pyramid.json")
+
+    def grid(self, level):
+        """ Get the number of tile columns and rows of the level.
+        """
+        w, h = self.levels[level]
+        return ceil(w / self.tile_size), ceil(h / self.tile_size)
+
+    def tile_path(self, level, col, row):
+        return self.dir / str(level) / f"{col}_{row}.png"
+
+    def tile(self, level, col, row):
+        """ Get the tile image, cut and cached on demand.
+            Return: PIL Image
+        """
+        path = self.tile_path(level, col, row)
+        if os.path.exists(path):
+            try:
+                with Image.open(path) as image:
+                    image.load()
+                    return image
+            except OSError:
+                # Partly written tile, it's cut again
+                pass
+        return self._cut(level, col, row)
+
+    def _cut(self, level, col, row):
+        """ Cuts the tile from the level image and saves it.
+        """
+        ts = self.tile_size
+        image = self.level_image(level)
+        w, h = self.levels[level]
+        box = (col * ts, row * ts, min(w, (col + 1) * ts), min(h, (row + 1) * ts))
+        tile = image.crop(box)
+        path = self.tile_path(level, col, row)
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tile.save(tmp_path, format="PNG", compress_level=1)
+        os.replace(tmp_path, path)
+        return tile
+
+    def level_image(self, level):
+        """ Get the downsampled image of the level.
+        """
+        with self._lock:
+            if level not in self._images:
+                if level == 0:
+                    with Image.open(self.path) as image:
+                        self._images[level] = image.convert("RGB")
+                else:
+                    self._images[level] = self.level_image(level - 1).reduce(2)
+            return self._images[level]
+
+    def build(self, token=None):
+        """ Cuts all tiles that are not cached yet, coarse levels first
+            so the overview is ready as soon as possible.
+        """
+        if self.complete:
+            return
+        # Downsampled levels are computed from the original once,
+        # the original is dropped while coarse levels are cut
+        self.level_image(len(self.levels) - 1)
+        with self._lock:
+            self._images.pop(0, None)
+        for level in reversed(range(len(self.levels))):
+            cols, rows = self.grid(level)
+            for row in range(rows):
+                for col in range(cols):
+                    if token and token.cancelled:
+                        self.release()
+                        return
+                    if not os.path.exists(self.tile_path(level, col, row)):
+                        self._cut(level, col, row)
+            with self._lock:
+                self._images.pop(level, None)
+        with open(self.dir / "pyramid.json", 'w') as file:
+            json.dump({'size': self.size, 'levels': self.levels}, file)
+        self.release()
+        evict(keep=(self.dir.name,))
+
+    def release(self):
+        """ Drops the level images from memory.
+        """
+        with self._lock:
+            self._images.clear()
+
+
+def evict(keep=()):
+    """ Removes the least recently used (by the directory mtime) pyramids
+        while the total size is over the limit. Pyramids in keep stay.
+    """
+    directory = cache_dir("tiles")
+    entries = []
+    total = 0
+    with os.scandir(directory) as pyramids:
+        for entry in pyramids:
+            if not entry.is_dir():
+                continue
+            size = 0
+            for root, _, files in os.walk(entry.path):
+                for file_name in files:
+                    try:
+                        size += os.path.getsize(os.path.join(root, file_name))
+                    except FileNotFoundError:
+                        pass
+            total += size
+            if entry.name not in keep:
+                entries.append((entry.stat().st_mtime, size, entry.path))
+    for _, size, path in sorted(entries):
+        if total <= TILE_CACHE_SIZE:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def remove_pyramid(path, stat):
+    """ Removes the cached tiles of the image version with the given stat.
+        Return: True if there were cached tiles
+    """
+    if stat is None or not (key := source_key(path, stat)):
+        return False
+    directory = cache_dir("tiles") / key
+    if not os.path.isdir(directory):
+        return False
+    shutil.rmtree(directory, ignore_errors=True)
+    return True
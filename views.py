@@ -0,0 +1,264 @@
+"""-------------------------------------------------------
+Views for large result sets:
+1. VirtualList  -  scrollable list that keeps widgets only
+                   for the visible rows and loads row
+                   thumbnails on demand
+-------------------------------------------------------"""
+
+import os
+from math import ceil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+from PIL import ImageTk, Image, ImageOps
+import imageio.v3 as iio
+
+from config.gui import ALLOWED_VIDEO
+from dispatcher import dispatcher
+from decoders import decoders, INTERACTIVE
+
+
+def load_thumbnail(path, size):
+    """ Reads the image (or the first video frame) and fits it into size.
+        Return: PIL Image
+    """
+    _, file_extension = os.path.splitext(path)
+    if file_extension.lower() in ALLOWED_VIDEO:
+        image = Image.fromarray(iio.imread(path, index=0, plugin="pyav"))
+    else:
+        image = Image.open(path)
+        # Let the decoder skip the resolution that is not needed
+        image.draft("RGB", size)
+    return ImageOps.contain(image.convert("RGB"), size, Image.Resampling.BILINEAR)
+
+
+def catalogue_row(record):
+    """ Converts the catalogue record to the list row.
+        Return: dict
+    """
+    details = [record['kind'], "x".join(str(v) for v in record.get('size', ()))]
+    if record['kind'] == "video":
+        details.append(f"{record.get('fps', 0)} fps")
+        details.append(f"{record.get('duration', 0)} sec")
+    if error := record.get('error'):
+        details.append(error)
+    return {
+        'text': os.path.basename(record['path']),
+        'detail': "  |  ".join(details) + f"  |  {record['path']}",
+        'thumb': None if record.get('error') else record['path'],
+    }
+
+
+def match_row(match):
+    """ Converts the search match to the list row.
+        Return: dict
+    """
+    text = os.path.basename(match['path'])
+    if (time := match.get('time')) is not None:
+        minutes, seconds = divmod(time, 60)
+        text += f"  @ {int(minutes):02d}:{seconds:04.1f}"
+    details = [
+        f"similarity {match['score']:.0%}",
+        f"distance {match['distance']}",
+        match['kind'],
+        match['path'],
+    ]
+    return {
+        'text': text,
+        'detail': "  |  ".join(details),
+        'thumb': match['path'],
+    }
+
+
+class VirtualList(ttk.Frame):
+    """ Scrollable list of rows. Only the rows that fit the visible area
+        have widgets, these are reused while scrolling. Each row is a dict
+        with 'text', optional 'detail' and optional 'thumb' (file path).
+    """
+    def __init__(self, master, row_height=40, thumb_size=(56, 32), thumb_cache=256, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_height = row_height
+        self.thumb_size = thumb_size
+
+        self._items = []
+        self._pool = []
+        self._offset = 0
+
+        # Thumbnails: LRU cache of PhotoImages and background loading
+        self._thumbs = OrderedDict()
+        self._thumb_cache = thumb_cache
+        self._loading = {}
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        # Thumbnails are decoded in the shared pool after the previews
+        self._decoder = decoders.client("thumbnails", INTERACTIVE)
+
+        self._scrollbar = ttk.Scrollbar(self, orient=VERTICAL, command=self.yview)
+        self._scrollbar.pack(side=RIGHT, fill=Y)
+        self._body = ttk.Frame(self)
+        self._body.pack(side=LEFT, fill=BOTH, expand=YES)
+        self._body.bind('<Configure>', self._on_resize)
+        self._bind_wheel(self._body)
+        self.bind('<Destroy>', self._on_destroy, add="+")
+
+    def __len__(self):
+        return len(self._items)
+
+    # Data -----------------------------------
+
+    def set_items(self, items):
+        """ Replaces all rows.
+        """
+        self._items = list(items)
+        self._offset = 0
+        self._refresh()
+
+    def append(self, item):
+        """ Adds the row at the end of the list.
+        """
+        self._items.append(item)
+        self._refresh()
+
+    def extend(self, items):
+        """ Adds the rows at the end of the list.
+        """
+        self._items.extend(items)
+        self._refresh()
+
+    def clear(self):
+        self.set_items([])
+
+    def see_end(self):
+        """ Scrolls to the last row.
+        """
+        self._offset = self._max_offset()
+        self._refresh()
+
+    def invalidate_thumb(self, path):
+        """ Drops the cached thumbnail of the path, it'll be loaded again.
+        """
+        self._thumbs.pop(path, None)
+        self._refresh()
+
+    # Scrolling ------------------------------
+
+    def yview(self, *args):
+        """ Scrollbar command: moveto fraction | scroll number units/pages.
+        """
+        if args[0] == "moveto":
+            self._offset = int(float(args[1]) * self._total_height())
+        elif args[0] == "scroll":
+            step = self.row_height if args[2] == "units" else self._body.winfo_height()
+            self._offset += int(args[1]) * step
+        self._refresh()
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview("scroll", -1, "units")
+        else:
+            self.yview("scroll", 1, "units")
+
+    def _bind_wheel(self, widget):
+        widget.bind('<MouseWheel>', self._on_wheel)
+        widget.bind('<Button-4>', self._on_wheel)
+        widget.bind('<Button-5>', self._on_wheel)
+
+    def _total_height(self):
+        return max(1, len(self._items) * self.row_height)
+
+    def _max_offset(self):
+        return max(0, self._total_height() - self._body.winfo_height())
+
+    # Rendering ------------------------------
+
+    def _on_resize(self, event):
+        """ Keeps one row widget per visible row (plus one partly visible).
+        """
+        count = ceil(event.height / self.row_height) + 1
+        while len(self._pool) < count:
+            row = ttk.Label(
+                master=self._body,
+                compound=LEFT,
+                anchor=W,
+                padding=(6, 0),
+                font=("Sans-serif", 10)
+            )
+            self._bind_wheel(row)
+            self._pool.append(row)
+        while len(self._pool) > count:
+            self._pool.pop().destroy()
+        self._refresh()
+
+    def _refresh(self):
+        """ Binds the visible rows to the pooled widgets.
+        """
+        self._offset = min(max(0, self._offset), self._max_offset())
+        first, shift = divmod(self._offset, self.row_height)
+        visible = set()
+        for i, row in enumerate(self._pool):
+            index = first + i
+            if index >= len(self._items):
+                row.place_forget()
+                continue
+            item = self._items[index]
+            text = item['text']
+            if detail := item.get('detail'):
+                text += f"\n{detail}"
+            row.configure(text=text, image=self._thumb(item.get('thumb'), visible))
+            row.place(
+                x=0,
+                y=i * self.row_height - shift,
+                relwidth=1,
+                height=self.row_height
+            )
+        # Loads that are not needed anymore are dropped
+        for path in list(self._loading):
+            if path not in visible and self._loading[path].cancel():
+                del self._loading[path]
+        total = self._total_height()
+        height = self._body.winfo_height()
+        self._scrollbar.set(self._offset / total, min(1, (self._offset + height) / total))
+
+    def _thumb(self, path, visible):
+        """ Get the cached thumbnail or start loading it.
+            Return: PhotoImage|""
+        """
+        if not path:
+            return ""
+        visible.add(path)
+        if path in self._thumbs:
+            self._thumbs.move_to_end(path)
+            return self._thumbs[path]
+        if path not in self._loading:
+            self._loading[path] = self._executor.submit(self._load, path)
+        return ""
+
+    def _load(self, path):
+        """ Thread function: loads the thumbnail image.
+        """
+        try:
+            with decoders.slot(self._decoder):
+                image = load_thumbnail(path, self.thumb_size)
+        except Exception:
+            image = None
+        dispatcher.post(self._loaded, path, image)
+
+    def _loaded(self, path, image):
+        """ Converts the loaded thumbnail to PhotoImage on the Tk thread.
+        """
+        self._loading.pop(path, None)
+        # Unreadable files get an empty thumbnail
+        self._thumbs[path] = ImageTk.PhotoImage(image) if image is not None else ""
+        self._thumbs.move_to_end(path)
+        # Keep the cache size flat
+        while len(self._thumbs) > self._thumb_cache:
+            self._thumbs.popitem(last=False)
+        # One refresh for the thumbnails loaded at once
+        dispatcher.post_latest((self, "refresh"), self._refresh)
+
+    def _on_destroy(self, event):
+        if event.widget is not self:
+            return
+        self._executor.shutdown(wait=False, cancel_futures=True)
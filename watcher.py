@@ -0,0 +1,116 @@
+"""---------------------------------------------------
+Watcher of the source files. Polls the stat data of
+the watched sources and notifies the dependent cached
+artifacts about changed files only.
+---------------------------------------------------"""
+
+import os
+import threading
+
+
+class SourceWatcher:
+    """ Polling watcher of the selected and catalogued sources.
+    """
+    def __init__(self, interval=3.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._paths = set()
+        self._providers = []
+        self._dependents = []
+        # Last known stat of each source, None if the file is missing
+        self._stats = {}
+
+    def watch(self, path):
+        """ Adds the single source path.
+        """
+        with self._lock:
+            self._paths.add(path)
+
+    def unwatch(self, path):
+        with self._lock:
+            self._paths.discard(path)
+            self._stats.pop(path, None)
+
+    def add_provider(self, provider):
+        """ Adds the callable returning source paths on each poll.
+        """
+        with self._lock:
+            self._providers.append(provider)
+
+    def depend(self, name, invalidate, rebuild=None):
+        """ Registers the cached artifact depending on the sources.
+            invalidate(path, old_stat) is called for every changed path,
+            rebuild(path) is called after all artifacts are invalidated.
+        """
+        with self._lock:
+            self._dependents.append((name, invalidate, rebuild))
+
+    def paths(self):
+        """ Get all watched paths.
+        """
+        with self._lock:
+            paths = set(self._paths)
+            providers = list(self._providers)
+        for provider in providers:
+            paths.update(provider())
+        return paths
+
+    def poll(self):
+        """ Checks the sources once and processes the changed ones.
+            Return: list of changed paths
+        """
+        changed = []
+        paths = self.paths()
+        with self._lock:
+            # Sources the providers stopped returning, e.g. removed from the catalogue
+            for path in set(self._stats) - paths:
+                del self._stats[path]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if path not in self._stats:
+                # The first look at the file is the baseline
+                self._stats[path] = stat
+                continue
+            old_stat = self._stats[path]
+            if self._same(old_stat, stat):
+                continue
+            self._stats[path] = stat
+            changed.append((path, old_stat))
+
+        with self._lock:
+            dependents = list(self._dependents)
+        for path, old_stat in changed:
+            for name, invalidate, _ in dependents:
+                self._notify(invalidate, path, old_stat)
+        for path, _ in changed:
+            for name, _, rebuild in dependents:
+                if rebuild:
+                    self._notify(rebuild, path)
+        return [path for path, _ in changed]
+
+    def _notify(self, callback, *args):
+        """ Calls the dependent, its failure doesn't stop the watcher.
+        """
+        try:
+            callback(*args)
+        except Exception:
+            pass
+
+    def _same(self, old_stat, stat):
+        if old_stat is None or stat is None:
+            return old_stat is stat
+        return old_stat.st_size == stat.st_size \
+            and old_stat.st_mtime_ns == stat.st_mtime_ns
+
+    def run(self, token):
+        """ Worker function: polls until cancelled.
+        """
+        while not token.wait(self.interval):
+            self.poll()
+
+
+# Shared watcher instance
+watcher = SourceWatcher()
@@ -0,0 +1,111 @@
+"""-----------------------------------------------
+Registry of the application background workers:
+1. CancelToken     -  cooperative cancellation flag
+2. Worker          -  thread with its own token
+3. WorkerRegistry  -  starts, cancels and joins workers
+-----------------------------------------------"""
+
+import threading
+import itertools
+import time
+
+
+class CancelToken:
+    """ Cancellation flag shared between the worker and its owner.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """ Requests the worker to stop.
+        """
+        self._event.set()
+
+    def wait(self, timeout):
+        """ Sleeps up to timeout seconds, wakes up early on cancellation.
+            Return: True if cancelled
+        """
+        return self._event.wait(timeout)
+
+
+class Worker:
+    """ Background thread managed by the registry.
+    """
+    def __init__(self, name, thread, token):
+        self.name = name
+        self.thread = thread
+        self.token = token
+
+    def cancel(self):
+        self.token.cancel()
+
+    def join(self, timeout=None):
+        self.thread.join(timeout)
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+
+class WorkerRegistry:
+    """ Central registry of the background workers.
+        Each target is called as target(token, *args, **kwargs) and must
+        return soon after the token is cancelled.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._counter = itertools.count(1)
+
+    def start(self, target, *args, name=None, **kwargs):
+        """ Starts the target on a new thread.
+            Return: Worker
+        """
+        token = CancelToken()
+        name = f"{name or target.__name__}-{next(self._counter)}"
+
+        def run():
+            try:
+                target(token, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._workers.pop(name, None)
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        worker = Worker(name, thread, token)
+        with self._lock:
+            self._workers[name] = worker
+        thread.start()
+        return worker
+
+    def workers(self):
+        """ Get the list of running workers.
+        """
+        with self._lock:
+            return list(self._workers.values())
+
+    def cancel(self, prefix=None):
+        """ Cancels all workers or the workers whose name starts with prefix.
+        """
+        for worker in self.workers():
+            if prefix is None or worker.name.startswith(prefix):
+                worker.cancel()
+
+    def shutdown(self, timeout=3.0):
+        """ Cancels all workers and waits for them within the timeout.
+            Return: list of workers that are still alive
+        """
+        workers = self.workers()
+        for worker in workers:
+            worker.cancel()
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0, deadline - time.monotonic()))
+        return [worker for worker in workers if worker.is_alive()]
+
+
+# Shared registry instance
+registry = WorkerRegistry()